@@ -1,45 +1,505 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import asyncio
+import os
+import socket
+import statistics
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Literal, Optional
 import speedtest
 
 app = FastAPI()
 
-def run_speed_test():
-    st = speedtest.Speedtest()
-    st.get_best_server()
-    return st
+# Peer bandwidth engine settings
+PEER_PORT = int(os.environ.get("PEER_PORT", "5201"))
+PEER_LISTEN = os.environ.get("PEER_LISTEN", "true").lower() == "true"
+PEER_BUFFER_SIZE = int(os.environ.get("PEER_BUFFER_SIZE", str(1024 * 1024)))
+PEER_MAX_STREAMS = int(os.environ.get("PEER_MAX_STREAMS", "64"))
+PEER_MAX_DURATION = float(os.environ.get("PEER_MAX_DURATION", "300"))
+PEER_IO_TIMEOUT = float(os.environ.get("PEER_IO_TIMEOUT", "10"))
+PEER_SENDFILE = os.environ.get("PEER_SENDFILE", "true").lower() == "true" and hasattr(os, "memfd_create")
+PEER_INTERVAL = float(os.environ.get("PEER_INTERVAL", "0.1"))
+
+# Speedtest and job settings
+SPEEDTEST_SERVER_TTL = float(os.environ.get("SPEEDTEST_SERVER_TTL", "600"))
+JOB_MAX_WORKERS = int(os.environ.get("JOB_MAX_WORKERS", "4"))
+JOB_HISTORY_SIZE = int(os.environ.get("JOB_HISTORY_SIZE", "50"))
+
+# Every data connection starts with: magic, mode, duration (seconds), buffer size
+PEER_MAGIC = b"BWT1"
+PEER_HEADER = struct.Struct("!4sBdI")
+PEER_MODE_SINK = 0    # client sends, peer counts and replies with the byte total on EOF
+PEER_MODE_SOURCE = 1  # peer sends for the requested duration, client counts
+PEER_TOTAL = struct.Struct("!Q")
+
+# Leading fields of Linux struct tcp_info: 8 u8 fields followed by u32 fields
+TCP_INFO = struct.Struct("8B24I")
+TCP_INFO_RTT = 8 + 15
+TCP_INFO_RTTVAR = 8 + 16
+TCP_INFO_SND_MSS = 8 + 2
+TCP_INFO_TOTAL_RETRANS = 8 + 23
+
+class StreamResult(BaseModel):
+    bytes: int
+    gbps: float
+    retransmits: Optional[int] = None
+    rtt_ms: Optional[float] = None
+
+class PeerTestResult(BaseModel):
+    target: str
+    port: int
+    direction: Literal["egress", "ingress"]
+    streams: int
+    duration_seconds: float
+    bytes: int
+    throughput_gbps: float
+    goodput_gbps: float
+    jitter_mbps: float
+    interval_mbps: List[float]
+    retransmits: Optional[int] = None
+    rtt_ms: Optional[float] = None
+    rttvar_ms: Optional[float] = None
+    zero_copy: Optional[bool] = None
+    per_stream: List[StreamResult]
+
+def set_io_timeout(sock, seconds):
+    """Socket timeouts without Python's timeout mode, which would make sendfile non-blocking"""
+    timeval = struct.pack("ll", int(seconds), int((seconds % 1) * 1_000_000))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, timeval)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, timeval)
+
+def tcp_info(sock):
+    if not hasattr(socket, "TCP_INFO"):
+        return None
+    try:
+        return TCP_INFO.unpack(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, TCP_INFO.size))
+    except (OSError, struct.error):
+        return None
+
+def recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("peer closed the connection early")
+        data += chunk
+    return bytes(data)
+
+class DataSource:
+    """A buffer of zeros sent either with sendfile from a memfd or as a memoryview"""
+
+    def __init__(self, size):
+        self.size = size
+        self.view = None
+        self.fd = None
+        if PEER_SENDFILE:
+            try:
+                self.fd = os.memfd_create("bandwidth-test")
+                os.ftruncate(self.fd, size)
+            except OSError:
+                self.close()
+        # The in-memory payload is only needed when sendfile is not used
+        if self.fd is None:
+            self.view = memoryview(bytearray(size))
+
+    def send(self, sock):
+        if self.fd is not None:
+            return os.sendfile(sock.fileno(), self.fd, 0, self.size)
+        return sock.send(self.view)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+class StreamMeter:
+    """Counts bytes for one stream, bucketed into PEER_INTERVAL slots for jitter"""
+
+    def __init__(self, started):
+        self.started = started
+        self.bytes = 0
+        self.intervals = []
+
+    def add(self, nbytes):
+        self.bytes += nbytes
+        slot = int((time.monotonic() - self.started) / PEER_INTERVAL)
+        if slot >= len(self.intervals):
+            self.intervals.extend([0] * (slot + 1 - len(self.intervals)))
+        self.intervals[slot] += nbytes
+
+def send_for(sock, source, meter, deadline):
+    while time.monotonic() < deadline:
+        meter.add(source.send(sock))
+
+def receive_all(sock, meter, buffer_size):
+    view = memoryview(bytearray(buffer_size))
+    while True:
+        received = sock.recv_into(view)
+        if not received:
+            return
+        meter.add(received)
+
+# Peer side: the data listener other pods run their tests against
+def serve_peer_stream(conn):
+    try:
+        set_io_timeout(conn, PEER_IO_TIMEOUT)
+        magic, mode, duration, buffer_size = PEER_HEADER.unpack(recv_exact(conn, PEER_HEADER.size))
+        if magic != PEER_MAGIC:
+            return
+        buffer_size = max(1, min(buffer_size, 64 * PEER_BUFFER_SIZE))
+        meter = StreamMeter(time.monotonic())
+        if mode == PEER_MODE_SINK:
+            receive_all(conn, meter, buffer_size)
+            conn.sendall(PEER_TOTAL.pack(meter.bytes))
+        elif mode == PEER_MODE_SOURCE:
+            source = DataSource(buffer_size)
+            try:
+                send_for(conn, source, meter, time.monotonic() + min(duration, PEER_MAX_DURATION))
+            finally:
+                source.close()
+            conn.shutdown(socket.SHUT_WR)
+    except (OSError, ConnectionError, struct.error) as e:
+        print(f"Peer stream ended with error: {e}")
+    finally:
+        conn.close()
+
+def peer_listener(host="0.0.0.0", port=PEER_PORT):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(PEER_MAX_STREAMS)
+    print(f"Bandwidth peer listening on {host}:{port}")
+    # The port is unauthenticated, so bound how many streams it will serve at once;
+    # connections over the cap are closed straight away
+    slots = threading.BoundedSemaphore(PEER_MAX_STREAMS)
+
+    def serve(conn):
+        try:
+            serve_peer_stream(conn)
+        finally:
+            slots.release()
+
+    while True:
+        conn, addr = sock.accept()
+        if not slots.acquire(blocking=False):
+            print(f"Rejected peer stream from {addr}: {PEER_MAX_STREAMS} streams already active")
+            conn.close()
+            continue
+        threading.Thread(target=serve, args=(conn,), daemon=True).start()
+
+# Client side: drives N parallel streams against a peer
+def run_peer_test(target, port, direction, streams, duration, buffer_size):
+    mode = PEER_MODE_SINK if direction == "egress" else PEER_MODE_SOURCE
+    sockets = []
+    try:
+        for _ in range(streams):
+            sock = socket.create_connection((target, port), timeout=PEER_IO_TIMEOUT)
+            sock.settimeout(None)
+            set_io_timeout(sock, PEER_IO_TIMEOUT)
+            sock.sendall(PEER_HEADER.pack(PEER_MAGIC, mode, duration, buffer_size))
+            sockets.append(sock)
+    except OSError as e:
+        for sock in sockets:
+            sock.close()
+        raise ConnectionError(f"could not connect to {target}:{port}: {e}")
+
+    source = DataSource(buffer_size) if direction == "egress" else None
+    started = time.monotonic()
+    deadline = started + duration
+    meters = [StreamMeter(started) for _ in sockets]
+    delivered = [0] * streams
+    infos = [None] * streams
+    errors = []
+
+    def run_stream(index):
+        sock, meter = sockets[index], meters[index]
+        try:
+            if direction == "egress":
+                send_for(sock, source, meter, deadline)
+                sock.shutdown(socket.SHUT_WR)
+                infos[index] = tcp_info(sock)
+                delivered[index] = PEER_TOTAL.unpack(recv_exact(sock, PEER_TOTAL.size))[0]
+            else:
+                receive_all(sock, meter, buffer_size)
+                delivered[index] = meter.bytes
+                infos[index] = tcp_info(sock)
+        except (OSError, ConnectionError) as e:
+            errors.append(str(e))
+            delivered[index] = meter.bytes if direction == "ingress" else 0
+        finally:
+            sock.close()
+
+    threads = [threading.Thread(target=run_stream, args=(i,)) for i in range(streams)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    # Whether the peer used sendfile for ingress is up to its own configuration
+    zero_copy = None
+    if source is not None:
+        zero_copy = source.fd is not None
+        source.close()
+    if errors and not any(delivered):
+        raise ConnectionError(f"all streams failed: {errors[0]}")
+
+    slots = max(len(meter.intervals) for meter in meters)
+    # Drop the trailing partial slot so it does not show up as a dip in throughput
+    slots = max(1, min(slots, int(duration / PEER_INTERVAL)))
+    interval_mbps = [
+        sum(meter.intervals[slot] if slot < len(meter.intervals) else 0 for meter in meters) * 8 / PEER_INTERVAL / 1e6
+        for slot in range(slots)
+    ]
+    total_bytes = sum(meter.bytes for meter in meters)
+
+    # Sender-side TCP_INFO is only available to us for egress; ingress reports what the receiver saw
+    retransmits = None
+    wire_bytes = total_bytes
+    if direction == "egress" and all(infos):
+        retransmits = sum(info[TCP_INFO_TOTAL_RETRANS] for info in infos)
+        wire_bytes += sum(info[TCP_INFO_TOTAL_RETRANS] * info[TCP_INFO_SND_MSS] for info in infos)
+    rtts = [info[TCP_INFO_RTT] / 1000 for info in infos if info]
+    rttvars = [info[TCP_INFO_RTTVAR] / 1000 for info in infos if info]
+
+    return PeerTestResult(
+        target=target,
+        port=port,
+        direction=direction,
+        streams=streams,
+        duration_seconds=elapsed,
+        bytes=total_bytes,
+        throughput_gbps=wire_bytes * 8 / elapsed / 1e9,
+        goodput_gbps=sum(delivered) * 8 / elapsed / 1e9,
+        jitter_mbps=statistics.pstdev(interval_mbps),
+        interval_mbps=interval_mbps,
+        retransmits=retransmits,
+        rtt_ms=statistics.mean(rtts) if rtts else None,
+        rttvar_ms=statistics.mean(rttvars) if rttvars else None,
+        zero_copy=zero_copy,
+        per_stream=[
+            StreamResult(
+                bytes=meter.bytes,
+                gbps=meter.bytes * 8 / elapsed / 1e9,
+                retransmits=info[TCP_INFO_TOTAL_RETRANS] if info and direction == "egress" else None,
+                rtt_ms=info[TCP_INFO_RTT] / 1000 if info else None,
+            )
+            for meter, info in zip(meters, infos)
+        ],
+    )
+
+class SpeedtestClient:
+    """Keeps one Speedtest with its config and best server for SPEEDTEST_SERVER_TTL seconds.
+
+    Building a Speedtest fetches the config and picking the best server pings a list of
+    candidates, which together cost seconds per request. Measurements share the cached
+    instance and are serialized, since concurrent runs would skew each other anyway.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.client = None
+        self.selected_at = 0.0
+
+    def _get(self):
+        if self.client is None or time.monotonic() - self.selected_at > self.ttl:
+            client = speedtest.Speedtest()
+            client.get_best_server()
+            self.client = client
+            self.selected_at = time.monotonic()
+        return self.client
+
+    def measure(self, download: bool, upload: bool) -> Dict[str, Any]:
+        with self.lock:
+            st = self._get()
+            result = {}
+            if download:
+                result["download_speed_mbps"] = st.download() / 1_000_000  # Convert to Mbps
+            if upload:
+                result["upload_speed_mbps"] = st.upload() / 1_000_000  # Convert to Mbps
+            if download and upload:
+                result["ping_ms"] = st.results.ping
+            return result
+
+    def info(self) -> Dict[str, Any]:
+        if self.client is None:
+            return {"server": None, "age_seconds": None, "ttl_seconds": self.ttl}
+        best = self.client.best
+        return {
+            "server": {key: best.get(key) for key in ("id", "host", "name", "country", "sponsor", "latency")},
+            "age_seconds": time.monotonic() - self.selected_at,
+            "ttl_seconds": self.ttl,
+        }
+
+speedtest_client = SpeedtestClient(SPEEDTEST_SERVER_TTL)
+
+class Job:
+    def __init__(self, kind: str, params: Dict[str, Any], runner: Callable[[], Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.runner = runner
+        self.status = "pending"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.future = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("pending", "running")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+class JobScheduler:
+    """Runs measurements on a background thread pool and keeps a bounded history.
+
+    A request for a measurement that is already pending or running with the same
+    parameters joins that job instead of starting another one.
+    """
+
+    def __init__(self, max_workers: int, history_size: int):
+        self.history_size = history_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bandwidth-job")
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, kind: str, params: Dict[str, Any], runner: Callable[[], Any]) -> Job:
+        with self.lock:
+            for existing in self.jobs.values():
+                if existing.active and existing.kind == kind and existing.params == params:
+                    return existing
+            job = Job(kind, params, runner)
+            self.jobs[job.id] = job
+            self._trim_history()
+            job.future = self.executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: Job):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = job.runner()
+            job.status = "completed"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self.jobs[job_id]
+
+scheduler = JobScheduler(JOB_MAX_WORKERS, JOB_HISTORY_SIZE)
+
+async def run_job(kind: str, params: Dict[str, Any], runner: Callable[[], Any], wait: bool):
+    """Submits (or joins) a job; waits for its result unless the caller asked for the job ID"""
+    job = scheduler.submit(kind, params, runner)
+    if not wait:
+        return JSONResponse(status_code=202, content=job.to_dict())
+    await asyncio.wrap_future(job.future)
+    if job.status == "failed":
+        raise HTTPException(status_code=502, detail=job.error)
+    return job.result
+
+@app.on_event("startup")
+def start_peer_listener():
+    if PEER_LISTEN:
+        threading.Thread(target=peer_listener, daemon=True).start()
+
+@app.get("/peer-test", response_model=List[PeerTestResult])
+async def peer_test(
+    target: str = Query(..., description="Host running another bandwidth-test instance"),
+    port: int = Query(PEER_PORT, description="Peer data port"),
+    direction: Literal["egress", "ingress", "both"] = Query("both", description="egress sends to the peer, ingress receives from it"),
+    streams: int = Query(4, ge=1, description="Parallel TCP streams"),
+    duration: float = Query(10, gt=0, description="Seconds per direction"),
+    buffer_size: int = Query(PEER_BUFFER_SIZE, ge=1024, le=64 * 1024 * 1024, description="Bytes per send/receive call"),
+    wait: bool = Query(True, description="Wait for the result instead of returning the job"),
+):
+    """
+    Measures pod-to-pod bandwidth against a peer's data listener.
+    """
+    if streams > PEER_MAX_STREAMS:
+        raise HTTPException(status_code=400, detail=f"streams must be at most {PEER_MAX_STREAMS}")
+    if duration > PEER_MAX_DURATION:
+        raise HTTPException(status_code=400, detail=f"duration must be at most {PEER_MAX_DURATION} seconds")
+
+    def runner():
+        directions = ["egress", "ingress"] if direction == "both" else [direction]
+        return [run_peer_test(target, port, current, streams, duration, buffer_size).dict() for current in directions]
+
+    params = {"target": target, "port": port, "direction": direction, "streams": streams,
+              "duration": duration, "buffer_size": buffer_size}
+    return await run_job("peer", params, runner, wait)
 
 @app.get("/test-ingress")
-async def test_ingress():
+async def test_ingress(wait: bool = Query(True, description="Wait for the result instead of returning the job")):
     """
     Tests download speed.
     """
-    st = run_speed_test()
-    download_speed = st.download() / 1_000_000  # Convert to Mbps
-    return {"download_speed_mbps": download_speed}
+    return await run_job("ingress", {}, lambda: speedtest_client.measure(download=True, upload=False), wait)
 
 @app.get("/test-egress")
-async def test_egress():
+async def test_egress(wait: bool = Query(True, description="Wait for the result instead of returning the job")):
     """
     Tests upload speed.
     """
-    st = run_speed_test()
-    upload_speed = st.upload() / 1_000_000  # Convert to Mbps
-    return {"upload_speed_mbps": upload_speed}
+    return await run_job("egress", {}, lambda: speedtest_client.measure(download=False, upload=True), wait)
 
 @app.get("/test-all")
-async def test_all():
+async def test_all(wait: bool = Query(True, description="Wait for the result instead of returning the job")):
     """
     Tests both download and upload speed.
     """
-    st = run_speed_test()
-    download_speed = st.download() / 1_000_000  # Convert to Mbps
-    upload_speed = st.upload() / 1_000_000  # Convert to Mbps
-    ping = st.results.ping
-    return {
-        "download_speed_mbps": download_speed,
-        "upload_speed_mbps": upload_speed,
-        "ping_ms": ping
-    }
+    return await run_job("all", {}, lambda: speedtest_client.measure(download=True, upload=True), wait)
+
+@app.get("/speedtest-server")
+def speedtest_server():
+    """
+    Returns the cached speedtest server and how long until it is selected again.
+    """
+    return speedtest_client.info()
+
+@app.get("/jobs")
+def list_jobs():
+    """
+    Lists pending, running and recently finished measurements.
+    """
+    with scheduler.lock:
+        jobs = list(scheduler.jobs.values())
+    return [job.to_dict() for job in reversed(jobs)]
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    Returns the status and result of one measurement.
+    """
+    job = scheduler.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 if __name__ == "__main__":
     import uvicorn
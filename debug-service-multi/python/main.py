@@ -1,16 +1,271 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request, Response
+from starlette.background import BackgroundTask
+from collections import deque
+from typing import Literal
+import asyncio
+import json
+import os
+import time
+import httpx
 import uvicorn
 
 app = FastAPI()
 
+# Sibling services probed by /health, as name=url pairs
+SIBLING_SERVICES = os.environ.get(
+    "SIBLING_SERVICES",
+    "python=http://localhost:8081/healthz,"
+    "golang=http://localhost:8082/healthz,"
+    "nodejs=http://localhost:8083/healthz,"
+    "ballerina=http://localhost:8084/healthz,"
+    "java=http://localhost:8085/healthz",
+)
+PROBE_TIMEOUT = float(os.environ.get("PROBE_TIMEOUT", "1.0"))
+HEALTH_CACHE_TTL = float(os.environ.get("HEALTH_CACHE_TTL", "2.0"))
+
+
+class HealthAggregator:
+    """Probes every sibling concurrently over one pooled client and caches the result.
+
+    Callers within HEALTH_CACHE_TTL get the cached result; callers that arrive while a
+    probe round is running wait for that round instead of starting another, so a burst
+    of requests costs one probe per sibling.
+    """
+
+    def __init__(self, services: str, timeout: float, ttl: float):
+        self.services = [self.parse_service(entry.strip()) for entry in services.split(",") if entry.strip()]
+        self.timeout = timeout
+        self.ttl = ttl
+        self.client = None
+        self.result = None
+        self.expires = 0.0
+        self.refreshing = None
+        self.probe_rounds = 0
+
+    @staticmethod
+    def parse_service(entry: str) -> tuple:
+        """Returns (name, url, problem); a malformed entry is kept and reported as unhealthy."""
+        name, _, url = entry.partition("=")
+        if not url:
+            return name or entry, None, "expected name=url"
+        try:
+            scheme = httpx.URL(url).scheme
+        except httpx.InvalidURL as e:
+            return name, None, f"invalid URL: {e}"
+        if scheme not in ("http", "https"):
+            return name, None, f"unsupported URL scheme {scheme!r}"
+        return name, url, None
+
+    async def start(self):
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(max_keepalive_connections=len(self.services)),
+        )
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+    async def probe(self, name: str, url: str, problem: str) -> dict:
+        started = time.perf_counter()
+        healthy = False
+        error = problem
+        if url is not None:
+            try:
+                # The overall deadline also covers connection setup and slow bodies
+                response = await asyncio.wait_for(self.client.get(url), self.timeout)
+                healthy = response.status_code == 200
+                error = None if healthy else f"status {response.status_code}"
+            except (httpx.HTTPError, httpx.InvalidURL, asyncio.TimeoutError) as e:
+                error = type(e).__name__
+        return {
+            "service": name,
+            "status": "healthy" if healthy else "unhealthy",
+            "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+            "error": error,
+        }
+
+    async def refresh(self) -> dict:
+        results = await asyncio.gather(*(self.probe(*service) for service in self.services))
+        self.probe_rounds += 1
+        all_healthy = all(result["status"] == "healthy" for result in results)
+        self.result = {
+            "status": "healthy" if all_healthy else "unhealthy",
+            "services": results,
+            "checked_at": time.time(),
+        }
+        self.expires = time.monotonic() + self.ttl
+        return self.result
+
+    async def get(self, fresh: bool = False) -> tuple:
+        """Returns (result, cached)."""
+        if not fresh and self.result is not None and time.monotonic() < self.expires:
+            return self.result, True
+        if self.refreshing is None:
+            self.refreshing = asyncio.ensure_future(self.refresh())
+            self.refreshing.add_done_callback(self._refreshed)
+        # Shielded so one caller disconnecting does not cancel the round for everyone else
+        return await asyncio.shield(self.refreshing), False
+
+    def _refreshed(self, task):
+        self.refreshing = None
+
+
+health = HealthAggregator(SIBLING_SERVICES, PROBE_TIMEOUT, HEALTH_CACHE_TTL)
+
+
+@app.on_event("startup")
+async def startup():
+    await health.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await health.close()
+
+
 @app.get("/healthz")
 async def health_check():
     return {"status": "healthy", "service": "python"}
 
+@app.get("/health")
+async def health_aggregate(response: Response, fresh: bool = False):
+    result, cached = await health.get(fresh)
+    response.status_code = 200 if result["status"] == "healthy" else 503
+    return {**result, "cached": cached, "probe_rounds": health.probe_rounds}
+
+# Number of recent /echo latencies kept for the percentiles in /echo/stats
+ECHO_LATENCY_SAMPLES = int(os.environ.get("ECHO_LATENCY_SAMPLES", "10000"))
+# Largest raw /echo body that is read in full before replying; bigger ones need duplex=true
+ECHO_BUFFER_LIMIT = int(os.environ.get("ECHO_BUFFER_LIMIT", str(16 * 1024 * 1024)))
+
+
+class EchoStats:
+    """Per-mode request, byte and latency counters for /echo.
+
+    Latency runs from the handler starting until the last response byte was handed to
+    the server, so the numbers line up with what the other language services report.
+    """
+
+    def __init__(self, samples: int):
+        self.modes = {mode: {"requests": 0, "errors": 0, "bytes_in": 0, "bytes_out": 0, "latency_seconds_total": 0.0}
+                      for mode in ("raw", "structured")}
+        self.latencies = {mode: deque(maxlen=samples) for mode in self.modes}
+
+    def record(self, mode: str, bytes_in: int, bytes_out: int, seconds: float, error: bool = False):
+        counters = self.modes[mode]
+        counters["requests"] += 1
+        counters["errors"] += int(error)
+        counters["bytes_in"] += bytes_in
+        counters["bytes_out"] += bytes_out
+        counters["latency_seconds_total"] += seconds
+        self.latencies[mode].append(seconds)
+
+    def report(self) -> dict:
+        report = {}
+        for mode, counters in self.modes.items():
+            latencies = sorted(self.latencies[mode])
+
+            def percentile(fraction):
+                return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000 if latencies else None
+
+            report[mode] = {
+                **counters,
+                "latency_ms_avg": counters["latency_seconds_total"] / counters["requests"] * 1000 if counters["requests"] else None,
+                "latency_ms_p50": percentile(0.5),
+                "latency_ms_p99": percentile(0.99),
+                "latency_ms_max": latencies[-1] * 1000 if latencies else None,
+            }
+        return report
+
+
+echo_stats = EchoStats(ECHO_LATENCY_SAMPLES)
+
+
+class PassthroughResponse(Response):
+    """Sends the request body back chunk by chunk as it arrives.
+
+    Unlike StreamingResponse this does not listen for a client disconnect on the side,
+    which would compete with the body stream for the same receive channel. The reply is
+    written while the request is still being read, so the client has to read while it
+    sends; one that sends the whole body first deadlocks once the socket buffers fill.
+    """
+
+    def __init__(self, request: Request, started: float):
+        self.status_code = 200
+        self.background = None
+        self.request = request
+        self.started = started
+        self.raw_headers = [(b"content-type", request.headers.get("content-type", "application/octet-stream").encode("latin-1"))]
+        # A known length is passed through so the reply is not chunked when the request was not
+        if "content-length" in request.headers:
+            self.raw_headers.append((b"content-length", request.headers["content-length"].encode("latin-1")))
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        size = 0
+        failed = True
+        try:
+            async for chunk in self.request.stream():
+                if chunk:
+                    size += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+            failed = False
+        finally:
+            echo_stats.record("raw", size, size, time.perf_counter() - self.started, error=failed)
+
+
+async def read_bounded(request: Request, limit: int) -> bytes:
+    """Reads the whole body, or raises 413 as soon as it is known to exceed `limit` bytes."""
+    if int(request.headers.get("content-length") or 0) > limit:
+        raise HTTPException(status_code=413, detail=f"Body exceeds {limit} bytes; use duplex=true to stream it")
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail=f"Body exceeds {limit} bytes; use duplex=true to stream it")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
 @app.post("/echo")
-async def echo(request: Request):
-    body = await request.json()
-    return {"service": "python", "echo": body}
+async def echo(request: Request, mode: Literal["raw", "structured"] = "raw", duplex: bool = False):
+    """Sends the body back unparsed with its content type (mode=raw), or parses it as JSON
+    and wraps it as {"service": "python", "echo": ...} (mode=structured).
+
+    Raw bodies up to ECHO_BUFFER_LIMIT are read in full before the reply starts, which
+    works with any client. duplex=true streams the reply while the body is still arriving,
+    with no size limit, but only for clients that read and send at the same time.
+    """
+    started = time.perf_counter()
+    if mode == "structured":
+        raw = await request.body()
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            echo_stats.record("structured", len(raw), 0, time.perf_counter() - started, error=True)
+            raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+        encoded = json.dumps({"service": "python", "echo": body}, separators=(",", ":")).encode()
+        echo_stats.record("structured", len(raw), len(encoded), time.perf_counter() - started)
+        return Response(encoded, media_type="application/json")
+
+    if duplex:
+        return PassthroughResponse(request, started)
+    try:
+        raw = await read_bounded(request, ECHO_BUFFER_LIMIT)
+    except HTTPException:
+        echo_stats.record("raw", 0, 0, time.perf_counter() - started, error=True)
+        raise
+    # Recorded once the reply has gone out, like the streamed path
+    done = BackgroundTask(lambda: echo_stats.record("raw", len(raw), len(raw), time.perf_counter() - started))
+    return Response(raw, headers={"content-type": request.headers.get("content-type", "application/octet-stream")},
+                    background=done)
+
+@app.get("/echo/stats")
+async def echo_stats_endpoint():
+    return echo_stats.report()
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8081) 
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8081)
@@ -0,0 +1,97 @@
+"""Regression benchmark: concurrent delayed requests must not serialize on the event loop.
+
+Starts debug-service with uvicorn, fires N concurrent `POST /debug?seconds=D` requests and
+checks that they all finish in roughly D seconds instead of N * D.
+
+    python benchmarks/concurrent_delay.py --requests 20 --delay 1
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_healthy(base_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/healthz")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+    raise RuntimeError(f"debug-service did not become healthy within {timeout} seconds")
+
+
+async def fire(base_url: str, requests: int, delay: int, path: str) -> list:
+    limits = httpx.Limits(max_connections=requests, max_keepalive_connections=requests)
+    async with httpx.AsyncClient(limits=limits, timeout=delay * requests + 30) as client:
+        async def one():
+            started = time.perf_counter()
+            response = await client.post(f"{base_url}{path}", params={"seconds": delay}, json={})
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+        return await asyncio.gather(*(one() for _ in range(requests)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20, help="number of concurrent requests")
+    parser.add_argument("--delay", type=int, default=1, help="seconds each request sleeps")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="fail when wall time exceeds delay * tolerance")
+    parser.add_argument("--path", default="/debug", help="delayed endpoint to exercise")
+    parser.add_argument("--url", help="benchmark an already running service instead of starting one")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=SERVICE_DIR,
+            env={**os.environ, "ACCESS_LOG_SAMPLE_RATE": "0"},
+        )
+
+    try:
+        asyncio.run(wait_until_healthy(base_url, timeout=30))
+        started = time.perf_counter()
+        latencies = asyncio.run(fire(base_url, args.requests, args.delay, args.path))
+        wall = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    budget = args.delay * args.tolerance
+    print(f"requests={args.requests} delay={args.delay}s")
+    print(f"wall time:        {wall:.3f}s (budget {budget:.3f}s, serialized would be {args.requests * args.delay}s)")
+    print(f"slowest request:  {max(latencies):.3f}s")
+    print(f"fastest request:  {min(latencies):.3f}s")
+
+    if wall > budget:
+        print("FAIL: delayed requests are serializing on the event loop")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Cold start benchmark: time from process launch to the first 200 from /healthz and /readiness.
+
+Starts `python main.py` repeatedly on a free port, polls both probes with plain sockets so
+the client adds no import cost of its own, and prints the service's /startup breakdown.
+
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(port: int, path: str):
+    """Returns (status, body), or None while the server is not accepting connections yet."""
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=1) as sock:
+            sock.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+            response = b""
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                response += chunk
+    except OSError:
+        return None
+    head, _, body = response.partition(b"\r\n\r\n")
+    if not head:
+        return None
+    return int(head.split(b" ", 2)[1]), body
+
+
+def measure(port: int, timeout: float, env: dict):
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "main.py"], cwd=SERVICE_DIR, env={**env, "PORT": str(port)},
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    healthy = ready = None
+    try:
+        while time.perf_counter() - started < timeout:
+            if healthy is None:
+                result = get(port, "/healthz")
+                if result and result[0] == 200:
+                    healthy = time.perf_counter() - started
+            if healthy is not None:
+                result = get(port, "/readiness")
+                if result and result[0] == 200:
+                    ready = time.perf_counter() - started
+                    break
+            time.sleep(0.002)
+        report = get(port, "/startup")
+        return healthy, ready, json.loads(report[1]) if report and report[0] == 200 else None
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="number of cold starts to measure")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for readiness per run")
+    args = parser.parse_args()
+
+    env = {**os.environ, "ACCESS_LOG_SAMPLE_RATE": "0"}
+    env.pop("STARTUP_DELAY", None)
+    healthy_times, ready_times, report = [], [], None
+    for run in range(args.runs):
+        healthy, ready, report = measure(free_port(), args.timeout, env)
+        if healthy is None or ready is None:
+            print(f"run {run + 1}: service did not become ready within {args.timeout} seconds")
+            sys.exit(1)
+        healthy_times.append(healthy)
+        ready_times.append(ready)
+        print(f"run {run + 1}: first /healthz 200 after {healthy:.3f}s, first /readiness 200 after {ready:.3f}s")
+
+    print(f"median time to /healthz:   {statistics.median(healthy_times):.3f}s")
+    print(f"median time to /readiness: {statistics.median(ready_times):.3f}s")
+    if report:
+        print("startup breakdown of the last run:")
+        if report["interpreter_seconds"] is not None:
+            print(f"  {'interpreter':<20} {report['interpreter_seconds']:.3f}s")
+        for phase in report["phases"]:
+            print(f"  {phase['phase']:<20} {phase['seconds']:.3f}s")
+        for lazy in report["lazy_imports"]:
+            print(f"  import {lazy['module']:<13} {lazy['seconds']:.3f}s (lazy)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,108 @@
+import time
+
+# Everything startup timing reports is relative to this point, right after the interpreter started
+MODULE_STARTED = time.perf_counter()
+
 import asyncio
 import os
-import time
-from typing import Optional, Dict
-from fastapi import FastAPI, File, UploadFile, WebSocket, WebSocketDisconnect, Request, Response, HTTPException
-from fastapi.responses import HTMLResponse, FileResponse
-from pydantic import BaseModel
-import requests
-import uvicorn
+from typing import TYPE_CHECKING, Optional, Dict
 import logging
-import shutil
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.requests import Request
-from starlette.responses import Response
+import logging.handlers
+import mimetypes
+import mmap
+import re
+from email.utils import formatdate
 import json
-from starlette.responses import StreamingResponse
-import psutil
 import signal
+import bisect
+import ctypes
+import hashlib
+import importlib
+import queue
+import multiprocessing
+import random
+import socket
+import struct
+from collections import deque
+import sys
+import tempfile
+import threading
+
+
+class StartupTimer:
+    """Records how long each startup phase took, for the /startup report.
+
+    Heavy optional modules (httpx, psutil, multipart) are imported on first use rather
+    than at module load; `lazy_import` records when and how long each of those took.
+    """
+
+    def __init__(self, started: float):
+        self.started = started
+        self.last = started
+        self.phases = []
+        self.lazy_imports = []
+        self.warmup_done = False
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append({"phase": phase, "seconds": now - self.last, "since_import": now - self.started})
+        self.last = now
+
+    def lazy_import(self, name: str):
+        module = sys.modules.get(name)
+        if module is None:
+            started = time.perf_counter()
+            module = importlib.import_module(name)
+            self.lazy_imports.append({
+                "module": name,
+                "seconds": time.perf_counter() - started,
+                "since_import": started - self.started,
+            })
+        return module
+
+    def report(self) -> dict:
+        return {
+            "interpreter_seconds": interpreter_startup_seconds(self.started),
+            "phases": self.phases,
+            "lazy_imports": self.lazy_imports,
+            "warmup_done": self.warmup_done,
+        }
+
+
+def interpreter_startup_seconds(module_started: float) -> Optional[float]:
+    """Time from process creation to this module starting to load (Linux only)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 is the process start time in clock ticks since boot; skip past the command name
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    process_age = uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    return max(0.0, process_age - (time.perf_counter() - module_started))
+
+
+startup_timer = StartupTimer(MODULE_STARTED)
+startup_timer.mark("stdlib imports")
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Response, HTTPException
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from starlette.responses import StreamingResponse
 from starlette.types import ASGIApp, Receive, Scope, Send
+from pydantic import BaseModel
+import uvicorn
+
+if TYPE_CHECKING:
+    # httpx is imported lazily at runtime; this only serves the annotations
+    import httpx
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+startup_timer.mark("fastapi imports")
 
 
 app = FastAPI()
@@ -38,78 +124,524 @@ xml_content = """
 </root>
 """
 
-# Uploaded file
-uploaded_file_path = None
 logger = logging.getLogger('uvicorn.error')
 logging.basicConfig(level=logging.DEBUG)
 logger.setLevel(logging.DEBUG)
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint):
-        start_time = time.time()
-
-        # Request details
-        request_details = {
-            "method": request.method,
-            "url": str(request.url),
-            "headers": dict(request.headers),
+# Access log settings
+ACCESS_LOG_SAMPLE_RATE = float(os.environ.get("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+ACCESS_LOG_MAX_FIELD_BYTES = int(os.environ.get("ACCESS_LOG_MAX_FIELD_BYTES", "1024"))
+ACCESS_LOG_QUEUE_SIZE = int(os.environ.get("ACCESS_LOG_QUEUE_SIZE", "10000"))
+# Hash full request and response bodies as they stream through (costs CPU per byte)
+ACCESS_LOG_HASH_BODIES = os.environ.get("ACCESS_LOG_HASH_BODIES", "false").lower() == "true"
+# Comma separated header names to log, "*" logs every header
+ACCESS_LOG_HEADERS = os.environ.get(
+    "ACCESS_LOG_HEADERS",
+    "host,user-agent,content-type,content-length,x-forwarded-for,x-request-id",
+)
+
+
+# JSON encoder for access logs and /debug: "orjson" when installed, otherwise "json"
+JSON_ENCODER = os.environ.get("JSON_ENCODER", "orjson" if orjson is not None else "json")
+if JSON_ENCODER == "orjson" and orjson is None:
+    raise RuntimeError("JSON_ENCODER=orjson but orjson is not installed")
+
+
+def encode_json(value) -> bytes:
+    if JSON_ENCODER == "orjson":
+        try:
+            return orjson.dumps(value, default=str)
+        except TypeError:
+            # orjson rejects integers beyond 64 bits even with default=str; json handles them
+            pass
+    return json.dumps(value, default=str, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_json(value) -> str:
+    return encode_json(value).decode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return encode_json(content)
+
+
+class AccessLogWriter:
+    """Queues access log records for a background thread that serializes and writes them.
+
+    The request path only samples, trims and enqueues. When the queue is full the
+    record is dropped and counted instead of blocking the event loop.
+    """
+
+    def __init__(self, sample_rate: float, max_field_bytes: int, header_allowlist: str, queue_size: int):
+        self.sample_rate = sample_rate
+        self.max_field_bytes = max_field_bytes
+        names = [name.strip().lower() for name in header_allowlist.split(",") if name.strip()]
+        self.all_headers = "*" in names
+        self.header_allowlist = frozenset(name.encode("latin-1") for name in names)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self._reported_drops = 0
+        self._thread = None
+
+    def should_sample(self) -> bool:
+        if self.sample_rate >= 1:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def headers(self, raw_headers) -> dict:
+        # ASGI header names are already lower-cased bytes; decoding is left to the writer thread
+        if self.all_headers:
+            return {key: self.trim(value) for key, value in raw_headers}
+        return {key: self.trim(value) for key, value in raw_headers if key in self.header_allowlist}
+
+    def trim(self, value):
+        if value is not None and len(value) > self.max_field_bytes:
+            return value[:self.max_field_bytes]
+        return value
+
+    def submit(self, record: dict):
+        if self._thread is None:
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="access-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        if self._thread is None:
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            dropped = self.dropped
+            if dropped > self._reported_drops:
+                logger.warning(f"Access log dropped {dropped - self._reported_drops} records under backpressure")
+                self._reported_drops = dropped
+            try:
+                logger.info(dumps_json(self._decode(record)))
+                self.written += 1
+            except Exception as e:
+                logger.error(f"Failed to write access log record: {e}")
+
+    def _decode(self, value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return bytes(value).decode("utf-8", "replace")
+        if isinstance(value, dict):
+            return {self._decode(key): self._decode(item) for key, item in value.items()}
+        return value
+
+
+access_log = AccessLogWriter(
+    sample_rate=ACCESS_LOG_SAMPLE_RATE,
+    max_field_bytes=ACCESS_LOG_MAX_FIELD_BYTES,
+    header_allowlist=ACCESS_LOG_HEADERS,
+    queue_size=ACCESS_LOG_QUEUE_SIZE,
+)
+
+
+# Metrics settings
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Directory shared by all workers; each worker flushes a snapshot there and /metrics merges them
+METRICS_MULTIPROC_DIR = os.environ.get("METRICS_MULTIPROC_DIR")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "1"))
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and fixed-bucket latency histograms.
+
+    All updates happen on the event loop thread, so plain dict and list updates need no
+    lock and a scrape never contends with the request path. With METRICS_MULTIPROC_DIR set
+    every worker periodically flushes a snapshot to that directory and a scrape on any
+    worker merges the snapshots of all of them.
+    """
+
+    def __init__(self, buckets: tuple, multiproc_dir: Optional[str], flush_interval: float):
+        self.buckets = buckets
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        # (method, route, status) -> per-bucket counts, +Inf count, then the sum of observations
+        self.histograms = {}
+        self.gauges = {
+            "http_requests_in_flight": 0,
+            "websocket_connections": 0,
+            "sse_subscribers": 0,
         }
-        if request.body:
-            request_details["body"] = await request.body()
-
-        # Response details
-        response = await call_next(request)
-        end_time = time.time()
-
-        response_details = {
-            "headers": dict(response.headers),
-            "status_code": response.status_code,
-            "latency": end_time - start_time,
-            "client_ip": request.client.host,
+        self._flush_task = None
+
+    def request_started(self):
+        self.gauges["http_requests_in_flight"] += 1
+        if self.multiproc_dir and self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    def request_finished(self, scope: Scope, status_code: int, seconds: float, route_path: Optional[str] = None):
+        self.gauges["http_requests_in_flight"] -= 1
+        if route_path is None:
+            route = scope.get("route")
+            # Label by route template rather than raw path to keep cardinality bounded
+            route_path = route.path if route is not None else "unmatched"
+        key = (scope["method"], route_path, status_code)
+        series = self.histograms.get(key)
+        if series is None:
+            series = self.histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, seconds)] += 1
+        series[-1] += seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "histograms": [[*key, list(series)] for key, series in self.histograms.items()],
+            "gauges": dict(self.gauges),
+            "counters": {
+                "access_log_written_total": access_log.written,
+                "access_log_dropped_total": access_log.dropped,
+                "proxy_upstream_requests_total": upstream_pool.requests,
+                "proxy_upstream_new_connections_total": upstream_pool.new_connections,
+                "proxy_upstream_reused_connections_total": upstream_pool.reused_connections,
+                **websocket_stats.counters(),
+                "sse_events_published_total": SSETicker.events_published,
+                "sse_slow_subscribers_dropped_total": SSETicker.slow_subscribers_dropped,
+            },
         }
-        if isinstance(response, StreamingResponse):
-            response_details["body"] = "StreamingResponse"
-        else:
-            response_details["body"] = response.body.decode(
-                'utf-8') if response.body else None
-
-        # Combine request and response details into one log
-        log_details = {
-            "request": request_details,
-            "response": response_details,
-        }
-
-        # Convert the log details into a JSON string and print it
-        logger.info(json.dumps(log_details, default=str))
-
-        return response
 
+    def snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.multiproc_dir, f"metrics-{pid}.json")
+
+    def write_snapshot(self, snapshot: dict):
+        path = self.snapshot_path(snapshot["pid"])
+        with open(f"{path}.tmp", "w") as f:
+            f.write(dumps_json(snapshot))
+        os.replace(f"{path}.tmp", path)
+
+    def read_snapshots(self) -> list:
+        snapshots = []
+        own_path = self.snapshot_path(os.getpid())
+        for name in os.listdir(self.multiproc_dir):
+            path = os.path.join(self.multiproc_dir, name)
+            if not name.startswith("metrics-") or not name.endswith(".json") or path == own_path:
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    async def _flush_loop(self):
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        while True:
+            try:
+                await asyncio.to_thread(self.write_snapshot, self.snapshot())
+            except OSError as e:
+                logger.warning(f"Failed to flush metrics snapshot: {e}")
+            await asyncio.sleep(self.flush_interval)
+
+    async def collect(self) -> list:
+        """Returns this worker's live snapshot plus the latest snapshot of every other worker."""
+        snapshots = [self.snapshot()]
+        if self.multiproc_dir and os.path.isdir(self.multiproc_dir):
+            for snapshot in await asyncio.to_thread(self.read_snapshots):
+                # Gauges of exited workers are stale, their counters still count
+                if not pid_alive(snapshot["pid"]):
+                    snapshot["gauges"] = {}
+                snapshots.append(snapshot)
+        return snapshots
+
+    def render(self, snapshots: list) -> str:
+        histograms = {}
+        gauges = {}
+        counters = {}
+        for snapshot in snapshots:
+            for method, route, status, series in snapshot["histograms"]:
+                merged = histograms.setdefault((method, route, status), [0] * len(series))
+                for i, value in enumerate(series):
+                    merged[i] += value
+            for name, value in snapshot["gauges"].items():
+                gauges[name] = gauges.get(name, 0) + value
+            for name, value in snapshot["counters"].items():
+                counters[name] = counters.get(name, 0) + value
+
+        lines = [
+            "# HELP http_request_duration_seconds HTTP request latency by route and status code.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), series in sorted(histograms.items()):
+            labels = f'method="{escape_label(method)}",route="{escape_label(route)}",status="{status}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {series[-1]}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+        for name in sorted(self.gauges):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {gauges.get(name, 0)}")
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+        lines.append("# TYPE metrics_workers gauge")
+        lines.append(f"metrics_workers {len(snapshots)}")
+        return "\n".join(lines) + "\n"
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+metrics = MetricsRegistry(METRICS_LATENCY_BUCKETS, METRICS_MULTIPROC_DIR, METRICS_FLUSH_INTERVAL)
+
+
+class BodyTap:
+    """Observes a body as it streams past: counts bytes, keeps a bounded prefix and optionally hashes it."""
+
+    __slots__ = ("size", "prefix", "limit", "digest")
+
+    def __init__(self, limit: int, hash_body: bool):
+        self.size = 0
+        self.prefix = bytearray()
+        self.limit = limit
+        self.digest = hashlib.sha256() if hash_body else None
+
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        self.size += len(chunk)
+        missing = self.limit - len(self.prefix)
+        if missing > 0:
+            self.prefix += chunk[:missing]
+        if self.digest is not None:
+            self.digest.update(chunk)
+
+    def summary(self) -> dict:
+        details = {"bytes": self.size}
+        if self.limit > 0:
+            details["prefix"] = bytes(self.prefix)
+        if self.digest is not None:
+            details["sha256"] = self.digest.hexdigest()
+        return details
+
+
+def apply_reset(scope: Scope, message: dict):
+    if scope.get("reset_connection", False):
+        headers = list(message.get("headers", []))
+        if not any(key.lower() == b"connection" for key, _ in headers):
+            headers.append((b"connection", b"close"))
+        message["headers"] = headers
+
+
+# Constant responses are served straight from the middleware, skipping routing and logging
+STATIC_FAST_PATH = os.environ.get("STATIC_FAST_PATH", "true").lower() == "true"
+
+
+class StaticResponse:
+    """A constant response encoded once, with its Content-Length and ETag precomputed"""
+
+    def __init__(self, body: bytes, content_type: str, status_code: int = 200):
+        self.status_code = status_code
+        self.body = body
+        self.etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        self.headers = [
+            (b"content-length", str(len(body)).encode()),
+            (b"content-type", content_type.encode()),
+            (b"etag", self.etag.encode()),
+        ]
+        self.not_modified_headers = [(b"etag", self.etag.encode())]
+
+    def not_modified(self, scope: Scope) -> bool:
+        for key, value in scope["headers"]:
+            if key == b"if-none-match":
+                tags = [tag.strip() for tag in value.decode("latin-1").split(",")]
+                return "*" in tags or self.etag in tags
+        return False
+
+    async def send(self, scope: Scope, send: Send) -> int:
+        if self.status_code == 200 and self.not_modified(scope):
+            await send({"type": "http.response.start", "status": 304, "headers": self.not_modified_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return 304
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else self.body})
+        return self.status_code
+
+
+def static_response(scope: Scope) -> Optional[StaticResponse]:
+    if not STATIC_FAST_PATH or scope["method"] not in ("GET", "HEAD"):
+        return None
+    path = scope["path"]
+    if path == "/readiness":
+        if shared_state.terminating:
+            return readiness_not_ready
+        return readiness_ready if startup_timer.warmup_done else readiness_warming_up
+    return static_routes.get(path)
+
+
+class AccessLogMiddleware:
+    """Pure ASGI access logging and connection reset handling.
+
+    Bodies are observed chunk by chunk through the wrapped receive/send channels and are
+    never buffered, so memory per request stays constant regardless of payload size.
+    """
 
-class ResetMiddleware:
     def __init__(self, app: ASGIApp):
         self.app = app
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send):
-        if scope["type"] == "http":
-            original_send = send
-
-            async def custom_send(message):
-                if message["type"] == "http.response.start" and scope.get("reset_connection", False):
-                    headers = message.get("headers", [])
-                    headers.append((b"Connection", b"close"))
-                    message["headers"] = headers
-                await original_send(message)
-
-            await self.app(scope, receive, custom_send)
-        else:
+        if scope["type"] != "http":
             await self.app(scope, receive, send)
-
-app.add_middleware(LoggingMiddleware)
-app.add_middleware(ResetMiddleware)
-
-
-terminating = False
+            return
+
+        start_time = time.perf_counter()
+        metrics.request_started()
+
+        static = static_response(scope)
+        if static is not None:
+            status_code = await static.send(scope, send)
+            metrics.request_finished(scope, status_code, time.perf_counter() - start_time, scope["path"])
+            return
+
+        if not access_log.should_sample():
+            status_code = 500
+
+            async def reset_send(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    apply_reset(scope, message)
+                    status_code = message["status"]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, reset_send)
+            finally:
+                metrics.request_finished(scope, status_code, time.perf_counter() - start_time)
+            return
+
+        request_body = BodyTap(access_log.max_field_bytes, ACCESS_LOG_HASH_BODIES)
+        response_body = BodyTap(access_log.max_field_bytes, ACCESS_LOG_HASH_BODIES)
+        response_start = {}
+        first_byte_time = None
+        last_byte_time = None
+
+        async def logging_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                request_body.feed(message.get("body", b""))
+            return message
+
+        async def logging_send(message):
+            nonlocal first_byte_time, last_byte_time
+            if message["type"] == "http.response.start":
+                apply_reset(scope, message)
+                first_byte_time = time.perf_counter()
+                response_start["status"] = message["status"]
+                response_start["headers"] = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                response_body.feed(message.get("body", b""))
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                last_byte_time = time.perf_counter()
+
+        try:
+            await self.app(scope, logging_receive, logging_send)
+        finally:
+            end_time = time.perf_counter()
+            metrics.request_finished(scope, response_start.get("status", 500), end_time - start_time)
+            query_string = scope.get("query_string", b"")
+            url = scope["path"] + ("?" + query_string.decode("latin-1") if query_string else "")
+            client = scope.get("client")
+
+            access_log.submit({
+                "request": {
+                    "method": scope["method"],
+                    "url": access_log.trim(url),
+                    "headers": access_log.headers(scope["headers"]),
+                    "body": request_body.summary(),
+                },
+                "response": {
+                    "headers": access_log.headers(response_start.get("headers", [])),
+                    "status_code": response_start.get("status"),
+                    "latency": end_time - start_time,
+                    "time_to_first_byte": first_byte_time - start_time if first_byte_time else None,
+                    "time_to_last_byte": last_byte_time - start_time if last_byte_time else None,
+                    "client_ip": client[0] if client else None,
+                    "body": response_body.summary(),
+                },
+            })
+
+app.add_middleware(AccessLogMiddleware)
+
+
+class SharedState:
+    """Termination flag and last uploaded file, kept in shared memory.
+
+    The values are allocated before workers are forked, so in supervisor mode every
+    worker reads and writes the same memory and /readiness flips on all of them at once.
+    """
+
+    def __init__(self):
+        self._terminating = multiprocessing.RawValue(ctypes.c_bool, False)
+        self._uploaded_file_path = multiprocessing.RawArray(ctypes.c_char, 4097)
+
+    @property
+    def terminating(self) -> bool:
+        return self._terminating.value
+
+    @terminating.setter
+    def terminating(self, value: bool):
+        self._terminating.value = value
+
+    @property
+    def uploaded_file_path(self) -> Optional[str]:
+        return self._uploaded_file_path.value.decode("utf-8") or None
+
+    @uploaded_file_path.setter
+    def uploaded_file_path(self, value: Optional[str]):
+        encoded = (value or "").encode("utf-8")
+        if len(encoded) >= len(self._uploaded_file_path):
+            raise ValueError("Uploaded file path is too long")
+        self._uploaded_file_path.value = encoded
+
+
+shared_state = SharedState()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return PlainTextResponse(
+        metrics.render(await metrics.collect()),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+healthz_response = StaticResponse(encode_json({"status": "OK"}), "application/json")
+readiness_ready = healthz_response
+readiness_not_ready = StaticResponse(encode_json({"detail": "Server is shutting down"}), "application/json", 503)
+readiness_warming_up = StaticResponse(encode_json({"detail": "Server is warming up"}), "application/json", 503)
 
 @app.get("/healthz", status_code=200)
 def healthz():
@@ -117,15 +649,17 @@ def healthz():
 
 @app.get("/readiness", status_code=200)
 def readiness():
-    if terminating:
+    if shared_state.terminating:
         raise HTTPException(status_code=503, detail="Server is shutting down")
+    if not startup_timer.warmup_done:
+        raise HTTPException(status_code=503, detail="Server is warming up")
     return {"status": "OK"}
 
 @app.post("/debug")
-async def debug_endpoint(request: Request, response: Response, seconds: Optional[int] = None, status_code: int = 200) :
+async def debug_endpoint(request: Request, seconds: Optional[int] = None, status_code: int = 200) :
     # Delay if 'seconds' is provided
     if seconds:
-        time.sleep(seconds)
+        await asyncio.sleep(seconds)
 
     # Extract all necessary information from the request
     request_info = {
@@ -133,15 +667,13 @@ async def debug_endpoint(request: Request, response: Response, seconds: Optional
         "query_params": dict(request.query_params),
         "path_params": request.path_params,
         "cookies": request.cookies,
-        "client": request.client,
+        "client": list(request.client) if request.client else None,
         "method": request.method,
         "url": str(request.url),
         "base_url": str(request.base_url),
         "body": await request.json() if request.headers.get("content-type") == "application/json" else None
     }
-    response.status_code = status_code
-
-    return request_info
+    return FastJSONResponse(request_info, status_code=status_code)
 
 
 @app.post("/log")
@@ -157,10 +689,466 @@ def log(message: str, level: str):
     return {"message": message, "level": level}
 
 
+# Bulk log settings
+LOG_BULK_QUEUE_SIZE = int(os.environ.get("LOG_BULK_QUEUE_SIZE", "100000"))
+LOG_BULK_BUFFER_SIZE = int(os.environ.get("LOG_BULK_BUFFER_SIZE", str(1024 * 1024)))
+LOG_BULK_FLUSH_INTERVAL = float(os.environ.get("LOG_BULK_FLUSH_INTERVAL", "0.5"))
+LOG_BULK_MAX_RATE = float(os.environ.get("LOG_BULK_MAX_RATE", "1000000"))
+LOG_BULK_MAX_DURATION = float(os.environ.get("LOG_BULK_MAX_DURATION", "600"))
+LOG_BULK_MAX_LINE_BYTES = int(os.environ.get("LOG_BULK_MAX_LINE_BYTES", str(64 * 1024)))
+LOG_BULK_MAX_CONCURRENT = int(os.environ.get("LOG_BULK_MAX_CONCURRENT", "4"))
+LOG_BULK_STOP_TIMEOUT = float(os.environ.get("LOG_BULK_STOP_TIMEOUT", "10"))
+LOG_BULK_TICK = 0.01
+
+LOG_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+
+class BlockingQueueHandler(logging.handlers.QueueHandler):
+    """Waits for room in the queue instead of dropping records, so floods slow down rather than lose lines"""
+
+    def prepare(self, record):
+        # Bulk messages are plain strings without args or exc_info, so the record can be
+        # handed over as is instead of being formatted here and again by the writer
+        return record
+
+    def enqueue(self, record):
+        self.queue.put(record)
+
+
+class BulkQueueListener(logging.handlers.QueueListener):
+    """Waits for room for the stop sentinel; the stock listener raises queue.Full if the queue is full at shutdown"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel, timeout=LOG_BULK_STOP_TIMEOUT)
+
+
+class BufferedStreamHandler(logging.StreamHandler):
+    """Writes through a large buffer and flushes at most every LOG_BULK_FLUSH_INTERVAL seconds"""
+
+    def __init__(self, stream, flush_interval: float):
+        super().__init__(stream)
+        self.flush_interval = flush_interval
+        self.last_flush = time.monotonic()
+
+    def flush(self):
+        now = time.monotonic()
+        if now - self.last_flush >= self.flush_interval:
+            self.last_flush = now
+            super().flush()
+
+    def flush_now(self):
+        self.last_flush = time.monotonic()
+        super().flush()
+
+    def close(self):
+        super().flush()
+        super().close()
+
+
+class BulkLogPipeline:
+    """Bulk log lines go through a QueueHandler to a QueueListener thread that writes them
+    to stdout through a buffered stream, so producers never wait on the terminal or pipe."""
+
+    def __init__(self, queue_size: int, buffer_size: int, flush_interval: float):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger("debug-service.bulk")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.listener = None
+        self.handler = None
+        self.queue_handler = None
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(LOG_BULK_MAX_CONCURRENT)
+
+    def start(self):
+        with self.lock:
+            if self.listener is not None:
+                return
+            stream = open(os.dup(sys.stdout.fileno()), "w", buffering=self.buffer_size, encoding="utf-8")
+            self.handler = BufferedStreamHandler(stream, self.flush_interval)
+            self.handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+            self.listener = BulkQueueListener(self.queue, self.handler)
+            self.listener.start()
+            self.queue_handler = BlockingQueueHandler(self.queue)
+            self.logger.addHandler(self.queue_handler)
+
+    def stop(self):
+        with self.lock:
+            if self.listener is not None:
+                # Detach first so a later start() does not leave two handlers feeding the queue
+                self.logger.removeHandler(self.queue_handler)
+                self.queue_handler = None
+                try:
+                    self.listener.stop()
+                except queue.Full:
+                    logger.warning(f"Bulk log queue did not drain within {LOG_BULK_STOP_TIMEOUT} seconds, dropping queued lines")
+                self.handler.close()
+                self.listener = None
+
+    def emit(self, level: int, messages) -> tuple:
+        """Logs each message and returns (lines, bytes)."""
+        lines = size = 0
+        log = self.logger.log
+        for message in messages:
+            log(level, message)
+            lines += 1
+            size += len(message)
+        return lines, size
+
+    def drain(self):
+        """Waits until the listener has written every queued line, then flushes the buffer."""
+        self.queue.join()
+        with self.lock:
+            if self.handler is not None:
+                self.handler.flush_now()
+
+
+bulk_log = BulkLogPipeline(LOG_BULK_QUEUE_SIZE, LOG_BULK_BUFFER_SIZE, LOG_BULK_FLUSH_INTERVAL)
+
+
+@app.on_event("shutdown")
+def stop_bulk_log():
+    bulk_log.stop()
+
+
+class LogFloodSpec(BaseModel):
+    lines_per_second: float = 1000
+    line_bytes: int = 200
+    level: str = "info"
+    duration: float = 10
+
+
+def generate_log_flood(spec: LogFloodSpec) -> tuple:
+    """Emits `lines_per_second` lines of `line_bytes` bytes for `duration` seconds, in small paced batches."""
+    level = LOG_LEVELS[spec.level]
+    padding = "x" * spec.line_bytes
+    started = time.perf_counter()
+    total = int(spec.lines_per_second * spec.duration)
+    lines = size = 0
+    while lines < total:
+        due = min(total, int((time.perf_counter() - started + LOG_BULK_TICK) * spec.lines_per_second))
+        if due > lines:
+            batch = (f"bulk line {i} " for i in range(lines, due))
+            emitted, emitted_size = bulk_log.emit(level, (prefix + padding[len(prefix):] for prefix in batch))
+            lines += emitted
+            size += emitted_size
+        delay = started + lines / spec.lines_per_second - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return lines, size
+
+
+class LineSplitter:
+    """Splits a byte stream into lines of at most `max_bytes`; the rest of a longer line is dropped and counted."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.pending = bytearray()
+        self.overflowed = False
+        self.truncated = 0
+
+    def _append(self, data: bytes):
+        if self.overflowed:
+            return
+        room = self.max_bytes - len(self.pending)
+        if len(data) > room:
+            self.pending += data[:room]
+            self.overflowed = True
+            self.truncated += 1
+        else:
+            self.pending += data
+
+    def _take(self) -> bytes:
+        line = bytes(self.pending)
+        self.pending.clear()
+        self.overflowed = False
+        return line
+
+    def feed(self, chunk: bytes) -> list:
+        *complete, rest = chunk.split(b"\n")
+        lines = []
+        for part in complete:
+            self._append(part)
+            lines.append(self._take())
+        self._append(rest)
+        return [line for line in lines if line.strip()]
+
+    def finish(self) -> list:
+        line = self._take()
+        return [line] if line.strip() else []
+
+
+def parse_log_line(line: bytes) -> tuple:
+    """An NDJSON line is either {"message": ..., "level": ...} or any other JSON value logged as is."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return logging.INFO, line.decode("utf-8", "replace")
+    if isinstance(record, dict) and "message" in record:
+        return LOG_LEVELS.get(str(record.get("level", "info")).lower(), logging.INFO), str(record["message"])
+    return logging.INFO, line.decode("utf-8", "replace")
+
+
+def emit_log_lines(lines: list) -> tuple:
+    count = size = 0
+    for line in lines:
+        level, message = parse_log_line(line)
+        emitted, emitted_size = bulk_log.emit(level, (message,))
+        count += emitted
+        size += emitted_size
+    return count, size
+
+
+@app.post("/log/bulk")
+async def log_bulk(request: Request):
+    """Floods the log through the bulk pipeline.
+
+    A JSON body is a generator spec (lines_per_second, line_bytes, level, duration);
+    any other body is read as NDJSON and every line is logged. NDJSON lines longer than
+    LOG_BULK_MAX_LINE_BYTES are cut to that length while the body is read.
+    """
+    if not bulk_log.slots.acquire(blocking=False):
+        raise HTTPException(status_code=429, detail=f"At most {LOG_BULK_MAX_CONCURRENT} bulk log requests can run at once")
+    try:
+        bulk_log.start()
+        started = time.perf_counter()
+        if request.headers.get("content-type", "").split(";")[0].strip() == "application/json":
+            try:
+                spec = LogFloodSpec(**await request.json())
+            except (ValueError, TypeError) as e:
+                raise HTTPException(status_code=400, detail=f"Invalid generator spec: {e}")
+            if spec.level not in LOG_LEVELS:
+                raise HTTPException(status_code=400, detail=f"level must be one of {', '.join(LOG_LEVELS)}")
+            if not 0 < spec.lines_per_second <= LOG_BULK_MAX_RATE:
+                raise HTTPException(status_code=400, detail=f"lines_per_second must be between 0 and {LOG_BULK_MAX_RATE}")
+            if not 0 < spec.duration <= LOG_BULK_MAX_DURATION:
+                raise HTTPException(status_code=400, detail=f"duration must be between 0 and {LOG_BULK_MAX_DURATION} seconds")
+            if not 0 <= spec.line_bytes <= LOG_BULK_MAX_LINE_BYTES:
+                raise HTTPException(status_code=400, detail=f"line_bytes must be between 0 and {LOG_BULK_MAX_LINE_BYTES}")
+            lines, size = await asyncio.to_thread(generate_log_flood, spec)
+            requested = {"lines_per_second": spec.lines_per_second, "line_bytes": spec.line_bytes,
+                         "level": spec.level, "duration": spec.duration}
+            truncated = 0
+        else:
+            lines = size = 0
+            splitter = LineSplitter(LOG_BULK_MAX_LINE_BYTES)
+            async for chunk in request.stream():
+                complete = splitter.feed(chunk)
+                if complete:
+                    emitted, emitted_size = await asyncio.to_thread(emit_log_lines, complete)
+                    lines += emitted
+                    size += emitted_size
+            tail = splitter.finish()
+            if tail:
+                emitted, emitted_size = await asyncio.to_thread(emit_log_lines, tail)
+                lines += emitted
+                size += emitted_size
+            truncated = splitter.truncated
+            requested = None
+        emitted_at = time.perf_counter()
+        # Rates count until the listener has taken every line, not just until they were queued
+        await asyncio.to_thread(bulk_log.drain)
+        finished = time.perf_counter()
+    finally:
+        bulk_log.slots.release()
+
+    elapsed = max(finished - started, 1e-9)
+    return {
+        "lines": lines,
+        "bytes": size,
+        "seconds": elapsed,
+        "emit_seconds": emitted_at - started,
+        "lines_per_second": lines / elapsed,
+        "bytes_per_second": size / elapsed,
+        "truncated_lines": truncated,
+        "requested": requested,
+    }
+
+
+# Upstream connection pool settings for /proxy
+PROXY_MAX_CONNECTIONS = int(os.environ.get("PROXY_MAX_CONNECTIONS", "100"))
+PROXY_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("PROXY_MAX_KEEPALIVE_CONNECTIONS", "20"))
+PROXY_MAX_CONNECTIONS_PER_HOST = int(os.environ.get("PROXY_MAX_CONNECTIONS_PER_HOST", "20"))
+PROXY_KEEPALIVE_EXPIRY = float(os.environ.get("PROXY_KEEPALIVE_EXPIRY", "30"))
+PROXY_CONNECT_TIMEOUT = float(os.environ.get("PROXY_CONNECT_TIMEOUT", "5"))
+PROXY_READ_TIMEOUT = float(os.environ.get("PROXY_READ_TIMEOUT", "30"))
+PROXY_POOL_TIMEOUT = float(os.environ.get("PROXY_POOL_TIMEOUT", "10"))
+PROXY_HTTP2 = os.environ.get("PROXY_HTTP2", "false").lower() == "true"
+
+# Headers that describe the hop between us and the upstream, not the relayed body
+HOP_BY_HOP_HEADERS = frozenset([
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade",
+])
+
+
+class UpstreamPool:
+    """Shared keep-alive client for proxied requests.
+
+    Connections are pooled by httpx; on top of that each upstream host gets a bounded
+    number of concurrent slots. The pool tracks how often a request reused a pooled
+    connection and how long requests waited for a per-host slot.
+    """
+
+    def __init__(self, max_connections: int, max_keepalive_connections: int, max_connections_per_host: int,
+                 keepalive_expiry: float, connect_timeout: float, read_timeout: float, pool_timeout: float,
+                 http2: bool):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_timeout = pool_timeout
+        self.max_connections_per_host = max_connections_per_host
+        self.http2 = http2
+        self._client = None
+        # host -> [semaphore, number of requests holding or waiting for it]
+        self._host_slots = {}
+        self.requests = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.errors = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            httpx = startup_timer.lazy_import("httpx")
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            )
+            timeout = httpx.Timeout(self.read_timeout, connect=self.connect_timeout, pool=self.pool_timeout)
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning("PROXY_HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+                    http2 = False
+            self._client = httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2, follow_redirects=True)
+        return self._client
+
+    async def acquire(self, url: "httpx.URL") -> str:
+        host = f"{url.scheme}://{url.host}:{url.port or ''}"
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = [asyncio.Semaphore(self.max_connections_per_host), 0]
+        slot[1] += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(slot[0].acquire(), self.pool_timeout)
+        except asyncio.TimeoutError:
+            self._forget(host, slot)
+            httpx = startup_timer.lazy_import("httpx")
+            raise httpx.PoolTimeout(f"No free slot for {host} within {self.pool_timeout} seconds")
+        except BaseException:
+            self._forget(host, slot)
+            raise
+        waited = time.perf_counter() - started
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+        return host
+
+    def release(self, host: str):
+        slot = self._host_slots.get(host)
+        if slot is not None:
+            slot[0].release()
+            self._forget(host, slot)
+
+    def _forget(self, host: str, slot: list):
+        # Idle hosts are dropped so the slot table stays as small as the set of busy upstreams
+        slot[1] -= 1
+        if slot[1] == 0:
+            del self._host_slots[host]
+
+    async def send(self, method: str, url: str, stream: bool = False, **kwargs) -> "httpx.Response":
+        """Sends a request through the pool. Streamed responses keep their host slot until `close` is called."""
+        connected = False
+
+        async def trace(event_name, info):
+            nonlocal connected
+            if event_name == "connection.connect_tcp.complete":
+                connected = True
+
+        request = self.client.build_request(method, url, extensions={"trace": trace}, **kwargs)
+        host = await self.acquire(request.url)
+        self.requests += 1
+        try:
+            response = await self.client.send(request, stream=stream)
+        except BaseException:
+            self.errors += 1
+            self.release(host)
+            raise
+        if connected:
+            self.new_connections += 1
+        else:
+            self.reused_connections += 1
+        if stream:
+            response.extensions["pool_host"] = host
+        else:
+            self.release(host)
+        return response
+
+    async def close_response(self, response: "httpx.Response"):
+        try:
+            await response.aclose()
+        finally:
+            self.release(response.extensions.pop("pool_host", None))
+
+    def stats(self) -> dict:
+        completed = self.new_connections + self.reused_connections
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_ratio": self.reused_connections / completed if completed else 0.0,
+            "wait_time_total": self.wait_time_total,
+            "wait_time_avg": self.wait_time_total / self.requests if self.requests else 0.0,
+            "wait_time_max": self.wait_time_max,
+            "busy_hosts": {host: slot[1] for host, slot in self._host_slots.items()},
+            "limits": {
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive_connections,
+                "max_connections_per_host": self.max_connections_per_host,
+                "keepalive_expiry": self.keepalive_expiry,
+                "http2": self.http2,
+            },
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+upstream_pool = UpstreamPool(
+    max_connections=PROXY_MAX_CONNECTIONS,
+    max_keepalive_connections=PROXY_MAX_KEEPALIVE_CONNECTIONS,
+    max_connections_per_host=PROXY_MAX_CONNECTIONS_PER_HOST,
+    keepalive_expiry=PROXY_KEEPALIVE_EXPIRY,
+    connect_timeout=PROXY_CONNECT_TIMEOUT,
+    read_timeout=PROXY_READ_TIMEOUT,
+    pool_timeout=PROXY_POOL_TIMEOUT,
+    http2=PROXY_HTTP2,
+)
+
+
 class ProxyRequest(BaseModel):
     url: str
     method: str
     payload: dict = None
+    stream: bool = False
 
 
 @app.post("/proxy")
@@ -169,22 +1157,33 @@ async def proxy(proxy_request: ProxyRequest):
     if method not in ['get', 'post', 'put', 'delete']:
         raise HTTPException(status_code=400, detail="Invalid method")
 
+    if method == 'get':
+        request_args = {"params": proxy_request.payload}
+    else:
+        request_args = {"json": proxy_request.payload}
+
+    httpx = startup_timer.lazy_import("httpx")
     try:
-        if method == 'get':
-            response = requests.get(
-                proxy_request.url, params=proxy_request.payload)
-        elif method == 'post':
-            response = requests.post(
-                proxy_request.url, json=proxy_request.payload)
-        elif method == 'put':
-            response = requests.put(
-                proxy_request.url, json=proxy_request.payload)
-        elif method == 'delete':
-            response = requests.delete(
-                proxy_request.url, json=proxy_request.payload)
-    except requests.exceptions.RequestException as e:
+        response = await upstream_pool.send(
+            method.upper(), proxy_request.url, stream=proxy_request.stream, **request_args)
+    except httpx.PoolTimeout as e:
+        # The upstream is saturated; tell the caller to back off rather than queueing forever
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    if proxy_request.stream:
+        # Relay the upstream status, headers and raw bytes chunk by chunk
+        async def relay():
+            try:
+                async for chunk in response.aiter_raw():
+                    yield chunk
+            finally:
+                await upstream_pool.close_response(response)
+
+        headers = {key: value for key, value in response.headers.items() if key.lower() not in HOP_BY_HOP_HEADERS}
+        return StreamingResponse(relay(), status_code=response.status_code, headers=headers)
+
     try:
         body = response.json()
     except ValueError:
@@ -193,6 +1192,11 @@ async def proxy(proxy_request: ProxyRequest):
     return {"response": {"headers": dict(response.headers), "body": body}}
 
 
+@app.get("/proxy/stats")
+def proxy_stats():
+    return upstream_pool.stats()
+
+
 @app.post("/custom-headers")
 async def custom_headers(custom_headers: Dict[str, str]):
     response = Response()
@@ -202,7 +1206,7 @@ async def custom_headers(custom_headers: Dict[str, str]):
 
 @app.get("/proxy-http-bin")
 async def proxy_http():
-    response = requests.get("http://httpbin.org/anything")
+    response = await upstream_pool.send("GET", "http://httpbin.org/anything")
     return response.json()
 
 
@@ -216,23 +1220,430 @@ def xml():
     return xml_content
 
 
+static_routes = {
+    "/healthz": healthz_response,
+    "/html": StaticResponse(html_content.encode("utf-8"), "text/html; charset=utf-8"),
+    "/xml": StaticResponse(xml_content.encode("utf-8"), "text/html; charset=utf-8"),
+}
+
+
+# Upload store settings
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "/tmp/debug-service-uploads")
+UPLOAD_BUFFER_SIZE = int(os.environ.get("UPLOAD_BUFFER_SIZE", str(4 * 1024 * 1024)))
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get("DOWNLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+
+class UploadStore:
+    """Content-addressed store for uploads.
+
+    Every file is kept under the sha256 of its contents, with a small JSON sidecar holding
+    the original filename, so any number of uploads stay retrievable by ID from any worker.
+    Uploading identical bytes again keeps the first upload's filename and content type, so
+    an ID never changes what it returns.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, file_id: str) -> Optional[str]:
+        if not re.fullmatch(r"[0-9a-f]{64}", file_id):
+            return None
+        path = os.path.join(self.directory, file_id)
+        return path if os.path.isfile(path) else None
+
+    def metadata(self, file_id: str) -> dict:
+        try:
+            with open(os.path.join(self.directory, f"{file_id}.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"id": file_id}
+
+    def list(self) -> list:
+        if not os.path.isdir(self.directory):
+            return []
+        return [self.metadata(name) for name in sorted(os.listdir(self.directory)) if self.path(name)]
+
+    def commit(self, temp_path: str, metadata: dict) -> tuple:
+        """Stores the upload and returns (stored metadata, deduplicated)."""
+        path = os.path.join(self.directory, metadata["id"])
+        if os.path.isfile(path) and os.path.isfile(f"{path}.json"):
+            os.unlink(temp_path)
+            return self.metadata(metadata["id"]), True
+        os.replace(temp_path, path)
+        with open(f"{path}.json.tmp", "w") as f:
+            f.write(dumps_json(metadata))
+        os.replace(f"{path}.json.tmp", f"{path}.json")
+        return metadata, False
+
+    def delete(self, file_id: str) -> bool:
+        path = self.path(file_id)
+        if path is None:
+            return False
+        os.unlink(path)
+        try:
+            os.unlink(f"{path}.json")
+        except FileNotFoundError:
+            pass
+        return True
+
+
+class UploadSink:
+    """Writes one upload into the store as it arrives.
+
+    Data is collected into UPLOAD_BUFFER_SIZE batches that are hashed and written to the
+    final filesystem from a worker thread, so the event loop never blocks on disk and the
+    body is never spooled anywhere else.
+    """
+
+    def __init__(self, store: UploadStore, filename: str, content_type: Optional[str]):
+        os.makedirs(store.directory, exist_ok=True)
+        self.store = store
+        self.filename = filename
+        self.content_type = content_type
+        self.fd, self.temp_path = tempfile.mkstemp(dir=store.directory, prefix=".upload-")
+        self.buffer = bytearray()
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    async def write(self, data: bytes):
+        self.buffer += data
+        self.size += len(data)
+        if len(self.buffer) >= UPLOAD_BUFFER_SIZE:
+            await self.flush()
+
+    async def flush(self):
+        if self.buffer:
+            buffer, self.buffer = self.buffer, bytearray()
+            await asyncio.to_thread(self._write, buffer)
+
+    def _write(self, buffer: bytearray):
+        self.digest.update(buffer)
+        view = memoryview(buffer)
+        while view:
+            view = view[os.write(self.fd, view):]
+
+    async def finish(self) -> tuple:
+        """Returns (stored metadata, deduplicated)."""
+        await self.flush()
+        os.close(self.fd)
+        self.fd = None
+        metadata = {
+            "id": self.digest.hexdigest(),
+            "filename": self.filename,
+            "content_type": self.content_type,
+            "size": self.size,
+        }
+        return await asyncio.to_thread(self.store.commit, self.temp_path, metadata)
+
+    def abort(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        try:
+            os.unlink(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+upload_store = UploadStore(UPLOAD_DIR)
+
+
+async def receive_multipart_upload(request: Request, content_type: str) -> tuple:
+    """Streams the first file part of a multipart body into the store without buffering it."""
+    multipart = startup_timer.lazy_import("multipart")
+    from multipart.multipart import parse_options_header
+
+    _, params = parse_options_header(content_type)
+    if b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Missing boundary in multipart body")
+
+    state = {"header_name": b"", "header_value": b"", "disposition": b"", "part_type": None, "in_file": False,
+             "done": False}
+    pending = []
+    sink = None
+
+    def on_part_begin():
+        state["disposition"] = b""
+        state["part_type"] = None
+
+    def on_header_field(data, start, end):
+        state["header_name"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        if state["header_name"].lower() == b"content-disposition":
+            state["disposition"] = state["header_value"]
+        elif state["header_name"].lower() == b"content-type":
+            state["part_type"] = state["header_value"].decode("latin-1")
+        state["header_name"] = b""
+        state["header_value"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(state["disposition"])
+        state["in_file"] = b"filename" in options and not state["done"]
+        if state["in_file"]:
+            pending.append(("begin", (options[b"filename"].decode("utf-8", "replace"), state["part_type"])))
+
+    def on_part_data(data, start, end):
+        if state["in_file"]:
+            pending.append(("data", data[start:end]))
+
+    def on_part_end():
+        if state["in_file"]:
+            state["in_file"] = False
+            state["done"] = True
+
+    parser = multipart.MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, value in pending:
+                if kind == "begin":
+                    sink = UploadSink(upload_store, *value)
+                else:
+                    await sink.write(value)
+            pending.clear()
+        parser.finalize()
+        if sink is None:
+            raise HTTPException(status_code=400, detail="No file part in multipart body")
+        return await sink.finish()
+    except BaseException:
+        if sink is not None:
+            sink.abort()
+        raise
+
+
 @app.post("/upload")
-async def upload(file: UploadFile = File(...)):
-    global uploaded_file_path
-    uploaded_file_path = f"/tmp/{file.filename}"
-    with open(uploaded_file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    return {"filename": file.filename}
-
-
-@app.get("/download")
-async def download():
-    if uploaded_file_path:
-        return FileResponse(uploaded_file_path)
+async def upload(request: Request, filename: Optional[str] = None):
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        metadata, deduplicated = await receive_multipart_upload(request, content_type)
+    else:
+        # Raw body upload, e.g. curl --data-binary @file -H 'Content-Type: application/octet-stream'
+        sink = UploadSink(upload_store, filename or "upload", content_type or None)
+        try:
+            async for chunk in request.stream():
+                await sink.write(chunk)
+            metadata, deduplicated = await sink.finish()
+        except BaseException:
+            sink.abort()
+            raise
+
+    shared_state.uploaded_file_path = os.path.join(upload_store.directory, metadata["id"])
+    return {"filename": metadata["filename"], "id": metadata["id"], "size": metadata["size"],
+            "sha256": metadata["id"], "deduplicated": deduplicated}
+
+
+def parse_range(header: Optional[str], size: int):
+    """Returns (start, end) for a single byte range, None to serve the whole file, or raises ValueError."""
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        # Multiple ranges are not supported, the full representation is a valid answer
+        return None
+    first, _, last = spec.partition("-")
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                raise ValueError("Empty suffix range")
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+class RangeFileResponse(Response):
+    """Serves a file with HTTP Range, ETag and If-None-Match support.
+
+    The body is sent through the ASGI zero-copy send extension (sendfile) when the server
+    offers it and otherwise read in DOWNLOAD_CHUNK_SIZE blocks from a worker thread.
+    """
+
+    def __init__(self, path: str, request: Request, etag: str, filename: Optional[str] = None,
+                 media_type: Optional[str] = None):
+        stat = os.stat(path)
+        self.path = path
+        self.send_body = request.method != "HEAD"
+        self.start, self.end = 0, stat.st_size - 1
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        }
+        if filename:
+            headers["content-disposition"] = f'attachment; filename="{filename}"'
+        media_type = media_type or mimetypes.guess_type(filename or path)[0] or "application/octet-stream"
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+            status_code = 304
+            self.send_body = False
+        else:
+            status_code = 200
+            try:
+                byte_range = parse_range(request.headers.get("range"), stat.st_size)
+            except ValueError:
+                byte_range = None
+                status_code = 416
+                self.send_body = False
+                headers["content-range"] = f"bytes */{stat.st_size}"
+            if byte_range is not None:
+                status_code = 206
+                self.start, self.end = byte_range
+                headers["content-range"] = f"bytes {self.start}-{self.end}/{stat.st_size}"
+        if status_code in (200, 206):
+            headers["content-length"] = str(self.end - self.start + 1)
+
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        count = self.end - self.start + 1
+        if not self.send_body or count <= 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopysend", "file": f, "offset": self.start, "count": count})
+                return
+            fd = f.fileno()
+            offset = self.start
+            remaining = count
+            while remaining > 0:
+                chunk = await asyncio.to_thread(os.pread, fd, min(DOWNLOAD_CHUNK_SIZE, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+
+
+def stored_file_response(request: Request, file_id: str) -> Response:
+    path = upload_store.path(file_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    metadata = upload_store.metadata(file_id)
+    return RangeFileResponse(path, request, etag=f'"{file_id}"', filename=metadata.get("filename"),
+                             media_type=metadata.get("content_type"))
+
+
+@app.api_route("/download", methods=["GET", "HEAD"])
+async def download(request: Request):
+    uploaded_file_path = shared_state.uploaded_file_path
+    if uploaded_file_path and os.path.isfile(uploaded_file_path):
+        return stored_file_response(request, os.path.basename(uploaded_file_path))
     else:
         return {"message": "No file uploaded"}
 
 
+@app.api_route("/download/{file_id}", methods=["GET", "HEAD"])
+async def download_by_id(request: Request, file_id: str):
+    return stored_file_response(request, file_id)
+
+
+@app.get("/uploads")
+async def list_uploads():
+    return {"uploads": await asyncio.to_thread(upload_store.list)}
+
+
+@app.delete("/uploads/{file_id}")
+async def delete_upload(file_id: str):
+    if not await asyncio.to_thread(upload_store.delete, file_id):
+        raise HTTPException(status_code=404, detail="File not found")
+    return {"id": file_id, "deleted": True}
+
+
+# Largest chunk /bytes can send; the pre-allocated payload buffers have this size
+PAYLOAD_BUFFER_SIZE = int(os.environ.get("PAYLOAD_BUFFER_SIZE", str(1024 * 1024)))
+payload_buffers = {}
+
+
+def payload_buffer(compressible: bool) -> memoryview:
+    """Returns the shared read-only buffer /bytes slices every chunk from, creating it on first use."""
+    buffer = payload_buffers.get(compressible)
+    if buffer is None:
+        if compressible:
+            pattern = b"The quick brown fox jumps over the lazy dog. "
+            data = (pattern * (PAYLOAD_BUFFER_SIZE // len(pattern) + 1))[:PAYLOAD_BUFFER_SIZE]
+        else:
+            data = os.urandom(PAYLOAD_BUFFER_SIZE)
+        buffer = payload_buffers[compressible] = memoryview(data)
+    return buffer
+
+
+class PayloadResponse(Response):
+    """Streams `total` bytes as memoryview slices of a pre-allocated buffer, optionally paced to `rate` bytes/s."""
+
+    def __init__(self, total: int, chunk_size: int, rate: Optional[float], compressible: bool, chunked: bool,
+                 media_type: str):
+        self.total = total
+        self.chunk_size = chunk_size
+        self.rate = rate
+        self.buffer = payload_buffer(compressible)
+        headers = {"x-payload-bytes": str(total)}
+        if not chunked:
+            headers["content-length"] = str(total)
+        super().__init__(headers=headers, media_type=media_type)
+        if chunked:
+            # Without a content-length the server falls back to chunked transfer encoding
+            self.raw_headers = [(key, value) for key, value in self.raw_headers if key != b"content-length"]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        chunk = self.buffer[:self.chunk_size]
+        sent = 0
+        started = time.perf_counter()
+        while sent < self.total:
+            size = min(self.chunk_size, self.total - sent)
+            sent += size
+            await send({
+                "type": "http.response.body",
+                "body": chunk if size == self.chunk_size else chunk[:size],
+                "more_body": sent < self.total,
+            })
+            if self.rate:
+                ahead = sent / self.rate - (time.perf_counter() - started)
+                if ahead > 0:
+                    await asyncio.sleep(ahead)
+        if self.total == 0:
+            await send({"type": "http.response.body", "body": b""})
+
+
+@app.get("/bytes")
+async def payload(size: Optional[int] = None, chunks: Optional[int] = None, chunk_size: int = 64 * 1024,
+                  rate: Optional[float] = None, content_type: str = "application/octet-stream",
+                  compressible: bool = False, chunked: bool = False):
+    if chunk_size <= 0 or chunk_size > PAYLOAD_BUFFER_SIZE:
+        raise HTTPException(status_code=400, detail=f"chunk_size must be between 1 and {PAYLOAD_BUFFER_SIZE}")
+    if size is None and chunks is None:
+        raise HTTPException(status_code=400, detail="Either size or chunks must be provided")
+    total = size if size is not None else chunks * chunk_size
+    if total < 0:
+        raise HTTPException(status_code=400, detail="Payload size must be non-negative")
+    if rate is not None and rate <= 0:
+        raise HTTPException(status_code=400, detail="rate must be positive")
+    return PayloadResponse(total, chunk_size, rate, compressible, chunked, content_type)
+
+
 @app.get("/stateless")
 async def stateless(seconds: Optional[int] = None):
     if seconds:
@@ -240,24 +1651,377 @@ async def stateless(seconds: Optional[int] = None):
     return {"status": "OK", "headers": {"Connection": "close"}}
 
 
+# WebSocket benchmark settings
+WEBSOCKET_MAX_PUSH_RATE = float(os.environ.get("WEBSOCKET_MAX_PUSH_RATE", "10000"))
+WEBSOCKET_MAX_MESSAGE_SIZE = int(os.environ.get("WEBSOCKET_MAX_MESSAGE_SIZE", str(1024 * 1024)))
+WEBSOCKET_ROOM_QUEUE_SIZE = int(os.environ.get("WEBSOCKET_ROOM_QUEUE_SIZE", "256"))
+
+# Pushed binary frames start with a sequence number and the server send time in ns
+WEBSOCKET_STAMP = struct.Struct("!QQ")
+
+
+class RateMeter:
+    """Events per second over the last `window` whole seconds"""
+
+    def __init__(self, window: int = 10):
+        self.window = window
+        self.buckets = [0] * window
+        self.current = int(time.monotonic())
+
+    def _advance(self, now: int):
+        if now - self.current >= self.window:
+            self.buckets = [0] * self.window
+        else:
+            for second in range(self.current + 1, now + 1):
+                self.buckets[second % self.window] = 0
+        self.current = now
+
+    def add(self, count: int = 1):
+        now = int(time.monotonic())
+        if now != self.current:
+            self._advance(now)
+        self.buckets[now % self.window] += count
+
+    def rate(self) -> float:
+        now = int(time.monotonic())
+        if now != self.current:
+            self._advance(now)
+        # The current second is still filling up, so average the completed ones
+        return (sum(self.buckets) - self.buckets[now % self.window]) / (self.window - 1)
+
+
+class WebSocketStats:
+    def __init__(self):
+        self.connections = 0
+        self.messages_received = 0
+        self.messages_sent = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.broadcast_dropped = 0
+        self.rtt_count = 0
+        self.rtt_sum = 0.0
+        self.received_rate = RateMeter()
+        self.sent_rate = RateMeter()
+
+    def received(self, size: int):
+        self.messages_received += 1
+        self.bytes_received += size
+        self.received_rate.add()
+
+    def sent(self, size: int, count: int = 1):
+        self.messages_sent += count
+        self.bytes_sent += size * count
+        self.sent_rate.add(count)
+
+    def counters(self) -> dict:
+        return {
+            "websocket_connections_total": self.connections,
+            "websocket_messages_received_total": self.messages_received,
+            "websocket_messages_sent_total": self.messages_sent,
+            "websocket_bytes_received_total": self.bytes_received,
+            "websocket_bytes_sent_total": self.bytes_sent,
+            "websocket_broadcast_dropped_total": self.broadcast_dropped,
+            "websocket_push_rtt_seconds_count": self.rtt_count,
+            "websocket_push_rtt_seconds_sum": self.rtt_sum,
+        }
+
+
+websocket_stats = WebSocketStats()
+
+
+class Room:
+    """Broadcast group; every member has a bounded queue drained by its own sender task.
+
+    A message is encoded once and the same object is queued for every member. Members
+    that fall behind lose messages instead of slowing the others down.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.members = set()
+
+    def publish(self, message):
+        for member in self.members:
+            try:
+                member.put_nowait(message)
+            except asyncio.QueueFull:
+                websocket_stats.broadcast_dropped += 1
+
+
+rooms: Dict[str, Room] = {}
+
+
+def message_payload(message: dict):
+    if message.get("bytes") is not None:
+        return message["bytes"]
+    return message.get("text") or ""
+
+
+async def send_payload(websocket: WebSocket, payload):
+    if isinstance(payload, bytes):
+        await websocket.send_bytes(payload)
+    else:
+        await websocket.send_text(payload)
+    websocket_stats.sent(len(payload))
+
+
+async def websocket_echo(websocket: WebSocket):
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        payload = message_payload(message)
+        websocket_stats.received(len(payload))
+        if isinstance(payload, bytes):
+            # Binary frames go back as the very same bytes object
+            await send_payload(websocket, payload)
+        else:
+            await send_payload(websocket, f"Echo: {payload}")
+
+
+async def websocket_push(websocket: WebSocket, rate: float, size: int, count: Optional[int], binary: bool):
+    async def pusher():
+        buffer = bytearray(max(size, WEBSOCKET_STAMP.size))
+        started = time.perf_counter()
+        seq = 0
+        while count is None or seq < count:
+            delay = started + seq / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if binary:
+                WEBSOCKET_STAMP.pack_into(buffer, 0, seq, time.time_ns())
+                await send_payload(websocket, bytes(buffer))
+            else:
+                stamp = f'{{"seq":{seq},"sent_ns":{time.time_ns()},"padding":"'
+                await send_payload(websocket, stamp + "x" * max(0, size - len(stamp) - 2) + '"}')
+            seq += 1
+
+    task = asyncio.create_task(pusher())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            payload = message_payload(message)
+            websocket_stats.received(len(payload))
+            # Clients echo pushed binary frames back; the embedded send time gives the RTT
+            if isinstance(payload, bytes) and len(payload) >= WEBSOCKET_STAMP.size:
+                _, sent_ns = WEBSOCKET_STAMP.unpack_from(payload)
+                websocket_stats.rtt_count += 1
+                websocket_stats.rtt_sum += (time.time_ns() - sent_ns) / 1e9
+    finally:
+        task.cancel()
+
+
+async def websocket_room(websocket: WebSocket, name: str):
+    room = rooms.get(name)
+    if room is None:
+        room = rooms[name] = Room(name)
+    inbox = asyncio.Queue(maxsize=WEBSOCKET_ROOM_QUEUE_SIZE)
+    room.members.add(inbox)
+
+    async def sender():
+        while True:
+            await send_payload(websocket, await inbox.get())
+
+    task = asyncio.create_task(sender())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            payload = message_payload(message)
+            websocket_stats.received(len(payload))
+            room.publish(payload)
+    finally:
+        task.cancel()
+        room.members.discard(inbox)
+        if not room.members:
+            rooms.pop(name, None)
+
+
 @app.websocket("/websocket")
-async def websocket(websocket: WebSocket):
+async def websocket(websocket: WebSocket, mode: str = "echo", rate: float = 10, size: int = 64,
+                    count: Optional[int] = None, binary: bool = True, room: str = "default"):
+    """Text messages are echoed with an "Echo: " prefix and binary frames unchanged (mode=echo).
+
+    mode=push sends `size` byte messages at `rate` per second, stamped with a sequence number
+    and send time; mode=room broadcasts every message to all members of `room`.
+    """
+    if mode not in ("echo", "push", "room") or not 0 < rate <= WEBSOCKET_MAX_PUSH_RATE \
+            or not 0 <= size <= WEBSOCKET_MAX_MESSAGE_SIZE:
+        await websocket.close(code=1008)
+        return
     await websocket.accept()
+    metrics.gauges["websocket_connections"] += 1
+    websocket_stats.connections += 1
     try:
-        while True:
-            data = await websocket.receive_text()
-            await websocket.send_text(f"Echo: {data}")
+        if mode == "push":
+            await websocket_push(websocket, rate, size, count, binary)
+        elif mode == "room":
+            await websocket_room(websocket, room)
+        else:
+            await websocket_echo(websocket)
     except WebSocketDisconnect:
         pass
+    finally:
+        metrics.gauges["websocket_connections"] -= 1
 
 
-@app.get("/sse")
-async def sse():
-    def event_stream():
+@app.get("/websocket/stats")
+def websocket_stats_endpoint():
+    return {
+        "connections": metrics.gauges["websocket_connections"],
+        **websocket_stats.counters(),
+        "messages_received_per_second": websocket_stats.received_rate.rate(),
+        "messages_sent_per_second": websocket_stats.sent_rate.rate(),
+        "rooms": {name: len(room.members) for name, room in rooms.items()},
+    }
+
+
+# SSE broadcaster settings
+SSE_QUEUE_SIZE = int(os.environ.get("SSE_QUEUE_SIZE", "64"))
+SSE_REPLAY_SIZE = int(os.environ.get("SSE_REPLAY_SIZE", "256"))
+SSE_HEARTBEAT_INTERVAL = float(os.environ.get("SSE_HEARTBEAT_INTERVAL", "15"))
+SSE_MIN_INTERVAL = float(os.environ.get("SSE_MIN_INTERVAL", "0.01"))
+SSE_MAX_PAYLOAD = int(os.environ.get("SSE_MAX_PAYLOAD", str(1024 * 1024)))
+SSE_MAX_TICKERS = int(os.environ.get("SSE_MAX_TICKERS", "32"))
+SSE_IDLE_TTL = float(os.environ.get("SSE_IDLE_TTL", "30"))
+
+
+class SSESubscriber:
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+        self.overflowed = False
+
+
+class SSETicker:
+    """One shared ticker per (interval, size), fanning events out to every subscriber.
+
+    Each event is encoded once. Recent events stay in a replay ring so a client that
+    reconnects with Last-Event-ID gets what it missed. A subscriber whose queue fills up
+    is disconnected rather than slowing the ticker; it can resume from its last ID.
+    When the last subscriber leaves the ticker stops, and its replay ring is kept for
+    SSE_IDLE_TTL seconds so a reconnecting client can still resume.
+    """
+
+    slow_subscribers_dropped = 0
+    events_published = 0
+
+    def __init__(self, interval: float, size: int):
+        self.interval = interval
+        self.size = size
+        self.seq = 0
+        self.replay = deque(maxlen=SSE_REPLAY_SIZE)
+        self.subscribers = set()
+        self.task = None
+        self.idle_since = time.monotonic()
+
+    def encode(self, seq: int) -> bytes:
+        data = f"The server time is {time.strftime('%X')}"
+        if len(data) < self.size:
+            data += " " + "x" * (self.size - len(data) - 1)
+        return f"id: {seq}\ndata: {data}\n\n".encode("utf-8")
+
+    def subscribe(self, last_event_id: Optional[int]) -> SSESubscriber:
+        subscriber = SSESubscriber()
+        if last_event_id is not None:
+            for seq, event in self.replay:
+                if seq > last_event_id and not subscriber.queue.full():
+                    subscriber.queue.put_nowait(event)
+        self.subscribers.add(subscriber)
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: SSESubscriber):
+        self.subscribers.discard(subscriber)
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+            self.idle_since = time.monotonic()
+
+    @property
+    def live(self) -> bool:
+        return bool(self.subscribers)
+
+    def publish(self, event: bytes):
+        for subscriber in self.subscribers:
+            if subscriber.overflowed:
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+                SSETicker.slow_subscribers_dropped += 1
+
+    async def run(self):
+        next_tick = time.perf_counter()
         while True:
-            yield f"data: The server time is {time.strftime('%X')}\n\n"
-            time.sleep(1)
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+            self.seq += 1
+            event = self.encode(self.seq)
+            self.replay.append((self.seq, event))
+            SSETicker.events_published += 1
+            self.publish(event)
+            # Schedule against the clock so slow fan-out does not stretch the interval
+            next_tick += self.interval
+            await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+
+
+sse_tickers: Dict[tuple, SSETicker] = {}
+
+
+def sse_ticker(interval: float, size: int) -> SSETicker:
+    """Returns the shared ticker for a stream, dropping tickers that have been idle too long.
+
+    Only tickers with subscribers count toward SSE_MAX_TICKERS; when the table is full the
+    longest-idle ticker is evicted to make room.
+    """
+    now = time.monotonic()
+    for key, idle in list(sse_tickers.items()):
+        if not idle.live and now - idle.idle_since >= SSE_IDLE_TTL:
+            del sse_tickers[key]
+    ticker = sse_tickers.get((interval, size))
+    if ticker is not None:
+        return ticker
+    if len(sse_tickers) >= SSE_MAX_TICKERS:
+        idle = [key for key, existing in sse_tickers.items() if not existing.live]
+        if not idle:
+            raise HTTPException(status_code=429, detail="Too many distinct interval/size streams")
+        del sse_tickers[min(idle, key=lambda key: sse_tickers[key].idle_since)]
+    ticker = sse_tickers[(interval, size)] = SSETicker(interval, size)
+    return ticker
+
+
+@app.get("/sse")
+async def sse(request: Request, interval: float = 1.0, size: int = 0, last_event_id: Optional[int] = None):
+    if interval < SSE_MIN_INTERVAL:
+        raise HTTPException(status_code=400, detail=f"interval must be at least {SSE_MIN_INTERVAL} seconds")
+    if not 0 <= size <= SSE_MAX_PAYLOAD:
+        raise HTTPException(status_code=400, detail=f"size must be between 0 and {SSE_MAX_PAYLOAD} bytes")
+    ticker = sse_ticker(interval, size)
+
+    # EventSource sends Last-Event-ID when it reconnects; the query parameter covers other clients
+    header = request.headers.get("last-event-id")
+    if header is not None and header.isdigit():
+        last_event_id = int(header)
+
+    subscriber = ticker.subscribe(last_event_id)
+    metrics.gauges["sse_subscribers"] += 1
+
+    async def event_stream():
+        try:
+            while not subscriber.overflowed:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield b": heartbeat\n\n"
+        finally:
+            ticker.unsubscribe(subscriber)
+            metrics.gauges["sse_subscribers"] -= 1
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @app.get("/crash")
@@ -271,6 +2035,16 @@ def shutdown():
     os._exit(0)
 
 
+def cpu_burner(fraction: float, end_time: float, period: float = 0.1):
+    """Busy-loops for `fraction` of every `period` seconds until `end_time`"""
+    while time.time() < end_time:
+        start = time.perf_counter()
+        while time.perf_counter() - start < period * fraction:
+            pass  # This will use CPU
+        idle = period - (time.perf_counter() - start)
+        if idle > 0:
+            time.sleep(idle)
+
 @app.get("/stress/cpu")
 async def stress_cpu(cpu_percent: int, duration: int):
     if cpu_percent < 0 or cpu_percent > 100:
@@ -279,10 +2053,17 @@ async def stress_cpu(cpu_percent: int, duration: int):
         raise HTTPException(status_code=400, detail="Duration must be non-negative")
 
     def cpu_load():
+        # One duty-cycle process per core, threads would be serialized by the GIL
+        context = multiprocessing.get_context("spawn")
         end_time = time.time() + duration
-        while time.time() < end_time:
-            if psutil.cpu_percent(interval=0.1) < cpu_percent:
-                pass  # This will use CPU
+        workers = [
+            context.Process(target=cpu_burner, args=(cpu_percent / 100, end_time), daemon=True)
+            for _ in range(os.cpu_count() or 1)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
 
     await asyncio.to_thread(cpu_load)
     return {"message": f"CPU stressed at {cpu_percent}% for {duration} seconds"}
@@ -295,13 +2076,19 @@ async def stress_memory(memory_percent: int, duration: int):
     if duration < 0:
         raise HTTPException(status_code=400, detail="Duration must be non-negative")
 
-    total_memory = psutil.virtual_memory().total
+    total_memory = startup_timer.lazy_import("psutil").virtual_memory().total
     memory_to_use = int(total_memory * memory_percent / 100)
 
     def memory_load():
-        data = bytearray(memory_to_use)
-        time.sleep(duration)
-        del data
+        # Anonymous mmap with every page written, so the memory is really resident,
+        # and unmapped as soon as the duration is over
+        size = max(mmap.PAGESIZE, memory_to_use - memory_to_use % mmap.PAGESIZE)
+        data = mmap.mmap(-1, size, flags=mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS)
+        try:
+            data[::mmap.PAGESIZE] = b"\x01" * len(range(0, size, mmap.PAGESIZE))
+            time.sleep(duration)
+        finally:
+            data.close()
 
     await asyncio.to_thread(memory_load)
     return {"message": f"Memory stressed at {memory_percent}% for {duration} seconds"}
@@ -313,6 +2100,33 @@ async def reset(request: Request, do: bool = False):
         return Response(content="Connection will be reset", status_code=200, headers={"Connection": "close"})
     return {"message": "Reset not performed"}
 
+# Modules imported after the server is listening, before /readiness reports ready
+WARMUP_MODULES = os.environ.get("WARMUP_MODULES", "httpx,psutil")
+
+
+@app.on_event("startup")
+async def start_warmup():
+    startup_timer.mark("server startup")
+    asyncio.create_task(warmup())
+
+
+async def warmup():
+    for name in filter(None, (name.strip() for name in WARMUP_MODULES.split(","))):
+        try:
+            await asyncio.to_thread(startup_timer.lazy_import, name)
+        except ImportError as e:
+            logger.warning(f"Warmup could not import {name}: {e}")
+    startup_timer.mark("warmup")
+    startup_timer.warmup_done = True
+
+
+@app.get("/startup")
+def startup_report():
+    return startup_timer.report()
+
+
+startup_timer.mark("app construction")
+
 server = None
 should_exit = asyncio.Event()
 
@@ -320,18 +2134,20 @@ should_exit = asyncio.Event()
 async def graceful_shutdown(signum, frame):
     print("Received shutdown signal, closing all connections...")
     global server
-    global terminating
-    terminating = True
+    shared_state.terminating = True
     if server:
         await server.shutdown()
         print("All connections closed. Waiting 5 seconds for FIN ACK...")
         await asyncio.sleep(5)  # Wait for 5 seconds after closing connections
+    await upstream_pool.close()
+    access_log.stop()
+    bulk_log.stop()
     should_exit.set()
 
 # Function to start the server
-async def start_server():
+async def start_server(port: int = 8080, sockets: Optional[list] = None):
     global server
-    config = uvicorn.Config(app, host="0.0.0.0", port=8080)
+    config = uvicorn.Config(app, host="0.0.0.0", port=port)
     server = uvicorn.Server(config)
     
     # Setup signal handlers
@@ -339,22 +2155,87 @@ async def start_server():
         signal.signal(sig, lambda s, f: asyncio.create_task(graceful_shutdown(s, f)))
     
     # Start the server
-    await server.serve()
+    await server.serve(sockets=sockets)
+
+def run_server(port: int, sockets: Optional[list] = None):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    try:
+        loop.run_until_complete(start_server(port, sockets))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(graceful_shutdown(None, None))
+        loop.close()
+
+# Supervisor mode: pre-fork worker processes that accept on one shared listening socket
+def run_supervisor(port: int, workers: int):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("0.0.0.0", port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Workers merge their metrics through snapshot files
+    if not metrics.multiproc_dir:
+        metrics.multiproc_dir = tempfile.mkdtemp(prefix="debug-service-metrics-")
+
+    # Fork so the workers inherit the listening socket and the shared state
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=run_server, args=(port, [sock]), name=f"worker-{i}")
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    print(f"Started {workers} workers on port {port}: {[process.pid for process in processes]}")
+
+    stopping = False
+
+    def handle_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, handle_signal)
+
+    exit_code = 0
+    while not stopping:
+        for process in processes:
+            # A crashed or exited worker takes the whole service down, like a single process would
+            if process.exitcode is not None:
+                print(f"Worker {process.pid} exited with code {process.exitcode}, stopping all workers...")
+                exit_code = process.exitcode
+                stopping = True
+                break
+        else:
+            time.sleep(0.2)
+
+    # Fail readiness on every worker at once, then let each worker drain its connections
+    shared_state.terminating = True
+    print("Received shutdown signal, stopping workers...")
+    for process in processes:
+        if process.is_alive():
+            os.kill(process.pid, signal.SIGTERM)
+    for process in processes:
+        process.join()
+    sock.close()
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     port = 8080
     if "PORT" in os.environ:
         port = int(os.environ["PORT"])
 
+    workers = 1
+    if "WORKERS" in os.environ:
+        workers = int(os.environ["WORKERS"])
+
     if "STARTUP_DELAY" in os.environ:
         time.sleep(int(os.environ["STARTUP_DELAY"]))
 
-    loop = asyncio.get_event_loop()
-    
-    try:
-        loop.run_until_complete(start_server())
-    except KeyboardInterrupt:
-        pass
-    finally:
-        loop.run_until_complete(graceful_shutdown(None, None))
-        loop.close()
+    if workers > 1:
+        run_supervisor(port, workers)
+    else:
+        run_server(port)
@@ -0,0 +1,4 @@
+"""Asyncio load generator for the toolbox services.
+
+Run a scenario with `python -m loadgen scenarios/debug-service.json`.
+"""
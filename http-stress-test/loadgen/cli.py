@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from .runner import RequestStats, run_process
+from .scenario import Scenario
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def merge_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    merged = {}
+    for result in results:
+        for name, data in result["stats"].items():
+            stats = RequestStats.from_dict(data)
+            if name in merged:
+                merged[name].merge(stats)
+            else:
+                merged[name] = stats
+    return {
+        "elapsed": max(result["elapsed"] for result in results),
+        "skipped": sum(result["skipped"] for result in results),
+        "connections_opened": sum(result["connections_opened"] for result in results),
+        "stats": merged,
+    }
+
+
+def ms(seconds: float) -> str:
+    return f"{seconds * 1000:.2f}"
+
+
+def print_report(scenario: Scenario, processes: int, merged: Dict[str, Any]):
+    elapsed = merged["elapsed"]
+    load = f"rate={scenario.rate:g}/s" if scenario.mode == "rate" else f"concurrency={scenario.concurrency}"
+    print(f"scenario {scenario.name}: {scenario.base_url} mode={scenario.mode} {load} "
+          f"duration={scenario.duration:g}s processes={processes}")
+    columns = ["name", "count", "rps"] + [f"p{p:g} ms" for p in PERCENTILES] + ["max ms", "errors"]
+    rows = []
+    total = RequestStats()
+    for name, stats in merged["stats"].items():
+        total.merge(stats)
+        rows.append(row(name, stats, elapsed))
+        for label, histogram in stats.detail.items():
+            detail = RequestStats()
+            detail.latency = histogram
+            rows.append(row(f"  {label}", detail, elapsed))
+    rows.append(row("total", total, elapsed))
+    widths = [max(len(str(r[i])) for r in rows + [columns]) for i in range(len(columns))]
+    for line in [columns] + rows:
+        print("  ".join(str(cell).ljust(width) if i == 0 else str(cell).rjust(width)
+                        for i, (cell, width) in enumerate(zip(line, widths))))
+    statuses = ", ".join(f"{status}: {count}" for status, count in sorted(total.statuses.items()))
+    print(f"statuses: {statuses or 'none'}")
+    if total.errors:
+        print("errors: " + ", ".join(f"{error}: {count}" for error, count in total.errors.most_common()))
+    if scenario.mode == "rate":
+        print(f"service time p50/p99: {ms(total.service_time.percentile(50))}/{ms(total.service_time.percentile(99))} ms, "
+              f"skipped (max_in_flight reached): {merged['skipped']}")
+    print(f"connections opened: {merged['connections_opened']}")
+
+
+def row(name: str, stats: RequestStats, elapsed: float) -> List[Any]:
+    histogram = stats.latency
+    return ([name, histogram.total, f"{histogram.total / elapsed:.1f}" if elapsed > 0 else "0"]
+            + [ms(histogram.percentile(p)) for p in PERCENTILES]
+            + [ms(histogram.max), sum(stats.errors.values())])
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="loadgen", description="Closed-loop and constant-rate HTTP load generator")
+    parser.add_argument("scenario", help="JSON scenario file")
+    parser.add_argument("--url", dest="base_url", help="override the scenario's base_url")
+    parser.add_argument("--mode", choices=("closed", "rate"), help="override the load mode")
+    parser.add_argument("--rate", type=float, help="requests per second across all processes (rate mode)")
+    parser.add_argument("--concurrency", type=int, help="requests in flight across all processes (closed mode)")
+    parser.add_argument("--duration", type=float, help="measured seconds, after warmup")
+    parser.add_argument("--warmup", type=float, help="seconds of load excluded from the report")
+    parser.add_argument("--connections", type=int, help="keep-alive connections across all processes")
+    parser.add_argument("--timeout", type=float, help="seconds before a request or session counts as a timeout error")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes (0 = one per core)")
+    parser.add_argument("--json", dest="json_output", help="also write merged histograms to this file")
+    args = parser.parse_args()
+
+    overrides = {key: getattr(args, key) for key in
+                 ("base_url", "mode", "rate", "concurrency", "duration", "warmup", "connections", "timeout")}
+    try:
+        scenario = Scenario.load(args.scenario, overrides)
+    except (OSError, ValueError, KeyError) as e:
+        sys.exit(f"invalid scenario {args.scenario}: {e}")
+    processes = args.processes or os.cpu_count() or 1
+
+    start_at = time.time() + 0.5 + 0.1 * processes
+    if processes == 1:
+        results = [run_process(scenario, 0, 1, start_at)]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(run_process, scenario, index, processes, start_at) for index in range(processes)]
+            results = [future.result() for future in futures]
+
+    merged = merge_results(results)
+    print_report(scenario, processes, merged)
+    if args.json_output:
+        with open(args.json_output, "w") as f:
+            json.dump({**merged, "stats": {name: stats.to_dict() for name, stats in merged["stats"].items()}}, f)
+
+    if sum(sum(stats.errors.values()) for stats in merged["stats"].values()):
+        sys.exit(1)
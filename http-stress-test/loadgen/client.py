@@ -0,0 +1,253 @@
+import asyncio
+import base64
+import os
+import ssl
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+READ_CHUNK = 64 * 1024
+
+
+class Target:
+    """Host, port and TLS settings parsed once from a base URL"""
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self.secure = parts.scheme in ("https", "wss")
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if self.secure else 80)
+        self.prefix = parts.path.rstrip("/")
+        self.host_header = parts.netloc
+        self.ssl = ssl.create_default_context() if self.secure else None
+
+    async def open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        return await asyncio.open_connection(self.host, self.port, ssl=self.ssl, limit=READ_CHUNK * 4)
+
+
+def encode_request(target: Target, method: str, path: str, headers: Dict[str, str], body: bytes,
+                   keep_alive: bool = True) -> bytes:
+    lines = [f"{method} {target.prefix}{path} HTTP/1.1", f"Host: {target.host_header}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    if body or method in ("POST", "PUT", "PATCH"):
+        lines.append(f"Content-Length: {len(body)}")
+    if not keep_alive:
+        lines.append("Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def read_head(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str]]:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed before the response")
+    status = int(status_line.split(b" ", 2)[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return status, headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+class HTTPConnection:
+    """One keep-alive HTTP/1.1 connection; bodies are read and counted, not kept"""
+
+    def __init__(self, target: Target):
+        self.target = target
+        self.reader = None
+        self.writer = None
+        self.closed = True
+
+    async def connect(self):
+        self.reader, self.writer = await self.target.open()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        if self.writer is not None:
+            self.writer.close()
+
+    async def request(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, int]:
+        self.writer.write(encode_request(self.target, method, path, headers, body))
+        await self.writer.drain()
+        status, response_headers = await read_head(self.reader)
+        received = await self._read_body(method, status, response_headers)
+        if response_headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, received
+
+    async def _read_body(self, method: str, status: int, headers: Dict[str, str]) -> int:
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            return 0
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            received = 0
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    return received
+                await self._discard(size)
+                await self.reader.readexactly(2)
+                received += size
+        if "content-length" in headers:
+            size = int(headers["content-length"])
+            await self._discard(size)
+            return size
+        # No framing: the body runs until the server closes the connection
+        received = 0
+        while True:
+            chunk = await self.reader.read(READ_CHUNK)
+            if not chunk:
+                self.close()
+                return received
+            received += len(chunk)
+
+    async def _discard(self, size: int):
+        while size:
+            chunk = await self.reader.read(min(size, READ_CHUNK))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", size)
+            size -= len(chunk)
+
+
+class ConnectionPool:
+    """Bounded pool of keep-alive connections to one target.
+
+    Idle connections are reused most-recently-used first. A request that fails on a reused
+    connection before any response arrived is retried once on a fresh connection, since
+    the server may have closed it while it sat idle.
+    """
+
+    def __init__(self, target: Target, size: int):
+        self.target = target
+        self.idle: List[HTTPConnection] = []
+        self.slots = asyncio.Semaphore(size)
+        self.opened = 0
+
+    async def _connection(self) -> Tuple[HTTPConnection, bool]:
+        while self.idle:
+            connection = self.idle.pop()
+            if not connection.closed:
+                return connection, True
+        connection = HTTPConnection(self.target)
+        await connection.connect()
+        self.opened += 1
+        return connection, False
+
+    async def request(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, int]:
+        async with self.slots:
+            connection, reused = await self._connection()
+            try:
+                result = await connection.request(method, path, headers, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                connection.close()
+                if not reused:
+                    raise
+                connection = HTTPConnection(self.target)
+                await connection.connect()
+                self.opened += 1
+                try:
+                    result = await connection.request(method, path, headers, body)
+                except BaseException:
+                    connection.close()
+                    raise
+            except BaseException:
+                connection.close()
+                raise
+            if not connection.closed:
+                self.idle.append(connection)
+            return result
+
+    def close(self):
+        for connection in self.idle:
+            connection.close()
+        self.idle.clear()
+
+
+async def websocket_session(target: Target, path: str, messages: int, payload: str) -> List[float]:
+    """Opens a websocket, sends `messages` text frames one at a time and returns each round trip"""
+    reader, writer = await target.open()
+    try:
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write(encode_request(target, "GET", path, {
+            "Upgrade": "websocket",
+            "Connection": "Upgrade",
+            "Sec-WebSocket-Key": key,
+            "Sec-WebSocket-Version": "13",
+        }, b""))
+        await writer.drain()
+        status, _ = await read_head(reader)
+        if status != 101:
+            raise ConnectionError(f"websocket upgrade failed with status {status}")
+
+        data = payload.encode()
+        round_trips = []
+        for _ in range(messages):
+            started = time.perf_counter()
+            writer.write(encode_frame(0x1, data))
+            await writer.drain()
+            opcode, _ = await read_frame(reader)
+            if opcode == 0x8:
+                raise ConnectionError("websocket closed by the server")
+            round_trips.append(time.perf_counter() - started)
+        writer.write(encode_frame(0x8, struct.pack("!H", 1000)))
+        await writer.drain()
+        return round_trips
+    finally:
+        writer.close()
+
+
+def encode_frame(opcode: int, data: bytes) -> bytes:
+    # Client frames must be masked; a zero mask keeps the payload as is
+    length = len(data)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, 0x80 | length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 0x80 | 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, length)
+    return header + b"\x00\x00\x00\x00" + data
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    data = await reader.readexactly(length)
+    if mask:
+        data = bytes(byte ^ mask[i % 4] for i, byte in enumerate(data))
+    return first & 0x0F, data
+
+
+async def sse_session(target: Target, path: str, events: int) -> Optional[float]:
+    """Reads `events` server-sent events and returns the time to the first one"""
+    reader, writer = await target.open()
+    try:
+        started = time.perf_counter()
+        writer.write(encode_request(target, "GET", path, {"Accept": "text/event-stream"}, b"", keep_alive=False))
+        await writer.drain()
+        status, headers = await read_head(reader)
+        if status != 200:
+            raise ConnectionError(f"event stream failed with status {status}")
+        chunked = headers.get("transfer-encoding", "").lower() == "chunked"
+        first_event = None
+        received = 0
+        while received < events:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("event stream closed early")
+            if chunked and not line.startswith((b"data:", b"event:", b"id:", b":", b"\r\n", b"\n")):
+                continue  # chunk size line
+            if line.startswith(b"data:"):
+                received += 1
+                if first_event is None:
+                    first_event = time.perf_counter() - started
+        return first_event
+    finally:
+        writer.close()
@@ -0,0 +1,81 @@
+import math
+from typing import Any, Dict
+
+
+class LogHistogram:
+    """Latency histogram with logarithmic buckets.
+
+    Every bucket covers values within `precision` (relative) of each other, so memory stays
+    at a few hundred buckets from microseconds to minutes. Counts are keyed by bucket
+    index, which makes histograms from different workers or processes merge by addition.
+    """
+
+    def __init__(self, precision: float = 0.01):
+        self.precision = precision
+        self.log_base = math.log1p(precision)
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _index(self, seconds: float) -> int:
+        micros = seconds * 1_000_000
+        if micros <= 1:
+            return 0
+        return int(math.log(micros) / self.log_base)
+
+    def _upper_bound(self, index: int) -> float:
+        return math.exp((index + 1) * self.log_base) / 1_000_000
+
+    def record(self, seconds: float, count: int = 1):
+        index = self._index(seconds)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.sum += seconds * count
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: "LogHistogram"):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge histograms with different precision")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent: float) -> float:
+        if not self.total:
+            return 0.0
+        rank = max(1, math.ceil(percent / 100 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(max(self._upper_bound(index), self.min), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "precision": self.precision,
+            "counts": {str(index): count for index, count in self.counts.items()},
+            "total": self.total,
+            "sum": self.sum,
+            "min": self.min if self.total else None,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogHistogram":
+        histogram = cls(data["precision"])
+        histogram.counts = {int(index): count for index, count in data["counts"].items()}
+        histogram.total = data["total"]
+        histogram.sum = data["sum"]
+        histogram.min = data["min"] if data["min"] is not None else math.inf
+        histogram.max = data["max"]
+        return histogram
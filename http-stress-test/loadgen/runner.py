@@ -0,0 +1,167 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Any, Dict
+
+from .client import ConnectionPool, Target, sse_session, websocket_session
+from .histogram import LogHistogram
+from .scenario import RequestSpec, Scenario
+
+
+class RequestStats:
+    """Latency histograms and outcome counters for one request name"""
+
+    def __init__(self):
+        self.latency = LogHistogram()
+        self.service_time = LogHistogram()
+        self.detail: Dict[str, LogHistogram] = {}
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.bytes = 0
+
+    def record_detail(self, label: str, seconds: float):
+        self.detail.setdefault(label, LogHistogram()).record(seconds)
+
+    def merge(self, other: "RequestStats"):
+        self.latency.merge(other.latency)
+        self.service_time.merge(other.service_time)
+        for label, histogram in other.detail.items():
+            self.detail.setdefault(label, LogHistogram()).merge(histogram)
+        self.statuses.update(other.statuses)
+        self.errors.update(other.errors)
+        self.bytes += other.bytes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency.to_dict(),
+            "service_time": self.service_time.to_dict(),
+            "detail": {label: histogram.to_dict() for label, histogram in self.detail.items()},
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "errors": dict(self.errors),
+            "bytes": self.bytes,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RequestStats":
+        stats = cls()
+        stats.latency = LogHistogram.from_dict(data["latency"])
+        stats.service_time = LogHistogram.from_dict(data["service_time"])
+        stats.detail = {label: LogHistogram.from_dict(h) for label, h in data["detail"].items()}
+        stats.statuses = Counter({int(status): count for status, count in data["statuses"].items()})
+        stats.errors = Counter(data["errors"])
+        stats.bytes = data["bytes"]
+        return stats
+
+
+class Worker:
+    """Runs a scenario's load inside one process and event loop"""
+
+    def __init__(self, scenario: Scenario, seed: int):
+        self.scenario = scenario
+        self.target = Target(scenario.base_url)
+        self.pool = ConnectionPool(self.target, scenario.connections)
+        self.rng = random.Random(seed)
+        self.stats = {name: RequestStats() for name in scenario.names()}
+        self.in_flight = 0
+        self.skipped = 0
+        self.measure_from = 0.0
+
+    async def execute(self, spec: RequestSpec, intended: float):
+        started = time.perf_counter()
+        stats = self.stats[spec.name]
+        timeout = spec.timeout or self.scenario.timeout
+        try:
+            # The deadline covers waiting for a pool slot, connecting and reading, so a stalled
+            # target turns into timeout errors instead of workers that never finish
+            if spec.kind == "websocket":
+                round_trips = await asyncio.wait_for(
+                    websocket_session(self.target, spec.path, spec.messages, spec.payload), timeout)
+                status, received = 101, 0
+            elif spec.kind == "sse":
+                first_event = await asyncio.wait_for(sse_session(self.target, spec.path, spec.events), timeout)
+                status, received = 200, 0
+            else:
+                status, received = await asyncio.wait_for(
+                    self.pool.request(spec.method, spec.path, spec.headers, spec.body), timeout)
+        except asyncio.TimeoutError:
+            if intended >= self.measure_from:
+                stats.errors["timeout"] += 1
+            return
+        except Exception as e:
+            if intended >= self.measure_from:
+                stats.errors[type(e).__name__] += 1
+            return
+        finished = time.perf_counter()
+        if intended < self.measure_from:
+            return
+        stats.latency.record(finished - intended)
+        stats.service_time.record(finished - started)
+        stats.statuses[status] += 1
+        stats.bytes += received
+        if not spec.ok(status):
+            stats.errors[f"status {status}"] += 1
+        if spec.kind == "websocket":
+            for round_trip in round_trips:
+                stats.record_detail("message", round_trip)
+        elif spec.kind == "sse" and first_event is not None:
+            stats.record_detail("first event", first_event)
+
+    async def closed_loop(self, end: float):
+        async def user():
+            while time.perf_counter() < end:
+                await self.execute(self.scenario.pick(self.rng), time.perf_counter())
+
+        await asyncio.gather(*(user() for _ in range(self.scenario.concurrency)))
+
+    async def open_loop(self, start: float, end: float, rate: float):
+        # Requests are issued on a fixed schedule; latency counts from the scheduled time,
+        # so a stalled server shows up as queueing delay instead of fewer samples
+        interval = 1.0 / rate
+        tasks = set()
+        scheduled = start
+        while scheduled < end:
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(tasks) >= self.scenario.max_in_flight:
+                self.skipped += 1
+            else:
+                task = asyncio.ensure_future(self.execute(self.scenario.pick(self.rng), scheduled))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            scheduled += interval
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def run(self, start_at: float, rate: float, offset: float) -> Dict[str, Any]:
+        # All processes share a wall-clock start so their schedules line up
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        start = time.perf_counter() + offset
+        self.measure_from = start + self.scenario.warmup
+        end = self.measure_from + self.scenario.duration
+        try:
+            if self.scenario.mode == "rate":
+                await self.open_loop(start, end, rate)
+            else:
+                await self.closed_loop(end)
+        finally:
+            self.pool.close()
+        return {
+            # Only requests scheduled inside the measured window are counted, so rates use its length
+            "elapsed": self.scenario.duration,
+            "skipped": self.skipped,
+            "connections_opened": self.pool.opened,
+            "stats": {name: stats.to_dict() for name, stats in self.stats.items()},
+        }
+
+
+def run_process(scenario: Scenario, index: int, processes: int, start_at: float) -> Dict[str, Any]:
+    """Entry point for one fan-out process; rate and concurrency are split evenly"""
+    scenario.concurrency = max(1, scenario.concurrency // processes + (index < scenario.concurrency % processes))
+    scenario.connections = max(1, scenario.connections // processes)
+    rate = scenario.rate / processes
+    # Stagger process schedules so their combined arrivals stay evenly spaced
+    offset = index / scenario.rate if scenario.mode == "rate" else 0.0
+    worker = Worker(scenario, seed=index)
+    return asyncio.run(worker.run(start_at, rate, offset))
@@ -0,0 +1,76 @@
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+MODES = ("closed", "rate")
+KINDS = ("http", "websocket", "sse")
+
+
+class RequestSpec:
+    """One weighted entry of a scenario's `requests` list"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.name = data.get("name") or data["path"]
+        self.kind = data.get("kind", "http")
+        if self.kind not in KINDS:
+            raise ValueError(f"{self.name}: kind must be one of {', '.join(KINDS)}")
+        self.method = data.get("method", "GET").upper()
+        self.path = data["path"]
+        self.headers = dict(data.get("headers", {}))
+        self.weight = float(data.get("weight", 1))
+        self.expect = set(data.get("expect_status", []))
+        self.messages = int(data.get("messages", 1))
+        self.payload = data.get("payload", "ping")
+        self.events = int(data.get("events", 1))
+        self.timeout = float(data["timeout"]) if "timeout" in data else None
+        if "json" in data:
+            self.body = json.dumps(data["json"]).encode()
+            self.headers.setdefault("Content-Type", "application/json")
+        else:
+            self.body = data.get("body", "").encode()
+
+    def ok(self, status: int) -> bool:
+        return status in self.expect if self.expect else status < 400
+
+
+class Scenario:
+    """Load profile plus the request mix, read from a JSON scenario file.
+
+    mode "closed" keeps `concurrency` requests in flight back to back; mode "rate" starts
+    `rate` requests per second on schedule regardless of how long earlier ones take, and
+    measures latency from the scheduled start so stalls are not hidden.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.name = data.get("name", "scenario")
+        self.base_url = data["base_url"]
+        self.mode = data.get("mode", "closed")
+        if self.mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        self.concurrency = int(data.get("concurrency", 10))
+        self.rate = float(data.get("rate", 100))
+        self.duration = float(data.get("duration", 30))
+        self.warmup = float(data.get("warmup", 0))
+        self.connections = int(data.get("connections", 64))
+        self.max_in_flight = int(data.get("max_in_flight", 10000))
+        # Deadline for one whole request or session, from connecting to the last byte
+        self.timeout = float(data.get("timeout", 30))
+        if self.timeout <= 0:
+            raise ValueError("timeout must be positive")
+        self.requests = [RequestSpec(entry) for entry in data["requests"]]
+        if not self.requests:
+            raise ValueError("a scenario needs at least one request")
+        self._weights = [spec.weight for spec in self.requests]
+
+    @classmethod
+    def load(cls, path: str, overrides: Optional[Dict[str, Any]] = None) -> "Scenario":
+        with open(path) as f:
+            data = json.load(f)
+        data.update({key: value for key, value in (overrides or {}).items() if value is not None})
+        return cls(data)
+
+    def pick(self, rng: random.Random) -> RequestSpec:
+        return rng.choices(self.requests, weights=self._weights)[0]
+
+    def names(self) -> List[str]:
+        return [spec.name for spec in self.requests]
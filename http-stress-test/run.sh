@@ -2,6 +2,17 @@
 
 set -x
 
+# Run a loadgen scenario when one is given, e.g. SCENARIO=scenarios/debug-service.json
+if [ -n "$SCENARIO" ]; then
+    set -- "$SCENARIO" --processes "${PROCESSES:-1}"
+    [ -n "$URL" ] && set -- "$@" --url "$URL"
+    [ -n "$MODE" ] && set -- "$@" --mode "$MODE"
+    [ -n "$RATE" ] && set -- "$@" --rate "$RATE"
+    [ -n "$CONCURRENCY" ] && set -- "$@" --concurrency "$CONCURRENCY"
+    [ -n "$DURATION" ] && set -- "$@" --duration "$DURATION"
+    exec python3 -m loadgen "$@"
+fi
+
 # Check if URL is set
 if [ -z "$URL" ]; then
     echo "URL environment variable is not set."
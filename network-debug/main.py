@@ -1,54 +1,282 @@
+import errno
+import os
+import selectors
 import socket
 import threading
 import struct
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import urllib.parse
 
+# TCP echo settings
+TCP_ECHO_BUFFER_SIZE = int(os.environ.get('TCP_ECHO_BUFFER_SIZE', '65536'))
+TCP_ECHO_BACKLOG = int(os.environ.get('TCP_ECHO_BACKLOG', '4096'))
+TCP_ECHO_LOG_CONNECTIONS = os.environ.get('TCP_ECHO_LOG_CONNECTIONS', 'true').lower() == 'true'
+# Pause after accept() fails for lack of file descriptors or memory, so existing
+# connections can close before the next attempt
+TCP_ECHO_ACCEPT_BACKOFF = float(os.environ.get('TCP_ECHO_ACCEPT_BACKOFF', '0.1'))
+
+# UDP echo settings
+UDP_ECHO_BUFFER_SIZE = int(os.environ.get('UDP_ECHO_BUFFER_SIZE', '65536'))
+UDP_ECHO_SOCKET_BUFFER = int(os.environ.get('UDP_ECHO_SOCKET_BUFFER', str(4 * 1024 * 1024)))
+UDP_ECHO_REPORT_INTERVAL = float(os.environ.get('UDP_ECHO_REPORT_INTERVAL', '10'))
+
+# Optional probe header reflected by the UDP echo: magic, sequence, client send time,
+# server receive time (nanoseconds). udp_client.py fills in the first three fields.
+UDP_PROBE_MAGIC = b'NDUP'
+UDP_PROBE_HEADER = struct.Struct('!4sIQQ')
+UDP_PROBE_SERVER_OFFSET = 16
+
+# HTTP fault server settings
+HTTP_BACKLOG = int(os.environ.get('HTTP_BACKLOG', '1024'))
+HTTP_LOG_REQUESTS = os.environ.get('HTTP_LOG_REQUESTS', 'true').lower() == 'true'
+HTTP_FAULT_MAX_DELAY = float(os.environ.get('HTTP_FAULT_MAX_DELAY', '300'))
+HTTP_FAULT_MAX_BYTES = int(os.environ.get('HTTP_FAULT_MAX_BYTES', str(64 * 1024 * 1024)))
+
+class EchoConnection:
+    """Per-connection state: bytes that could not be echoed yet and throughput counters"""
+    __slots__ = ('sock', 'addr', 'pending', 'bytes_in', 'bytes_out', 'opened')
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.pending = bytearray()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.opened = time.monotonic()
+
 # TCP Echo Server
 def tcp_echo_server(host='0.0.0.0', port=5600):
+    """Echoes every connection until EOF, multiplexing all of them on one selector.
+
+    Data is received into one reusable buffer and sent straight back; only bytes the
+    socket could not take right away are copied into the connection's pending buffer,
+    and reading from that connection pauses until they are flushed.
+    """
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     sock.bind((host, port))
-    sock.listen(5)
+    sock.listen(TCP_ECHO_BACKLOG)
+    sock.setblocking(False)
     print(f'TCP Echo Server listening on {host}:{port}')
 
+    selector = selectors.DefaultSelector()
+    selector.register(sock, selectors.EVENT_READ, None)
+    view = memoryview(bytearray(TCP_ECHO_BUFFER_SIZE))
+
+    def close(conn):
+        selector.unregister(conn.sock)
+        conn.sock.close()
+        if TCP_ECHO_LOG_CONNECTIONS:
+            elapsed = time.monotonic() - conn.opened
+            rate = conn.bytes_out / elapsed / 1_000_000 if elapsed > 0 else 0.0
+            print(f'TCP connection from {conn.addr} closed: {conn.bytes_in} bytes in, '
+                  f'{conn.bytes_out} bytes out in {elapsed:.3f}s ({rate:.2f} MB/s)')
+
+    def flush(conn):
+        sent = conn.sock.send(conn.pending)
+        conn.bytes_out += sent
+        del conn.pending[:sent]
+        if not conn.pending:
+            # Reading is paused while bytes are pending, so EOF is only ever seen in echo()
+            selector.modify(conn.sock, selectors.EVENT_READ, conn)
+
+    def echo(conn):
+        received = conn.sock.recv_into(view)
+        if received == 0:
+            # Peer is done sending; everything has been echoed, so close our side too
+            conn.sock.shutdown(socket.SHUT_WR)
+            close(conn)
+            return
+        conn.bytes_in += received
+        try:
+            sent = conn.sock.send(view[:received])
+        except BlockingIOError:
+            sent = 0
+        conn.bytes_out += sent
+        if sent < received:
+            conn.pending += view[sent:received]
+            selector.modify(conn.sock, selectors.EVENT_WRITE, conn)
+
     while True:
-        conn, addr = sock.accept()
-        print(f'TCP connection from {addr}')
-        data = conn.recv(1024)
-        if not data:
-            break
-        print(f'Received data: {data.decode()}')
-        conn.sendall(data)  # Echo the received data back
-    conn.close()
+        for key, events in selector.select():
+            if key.data is None:
+                while True:
+                    try:
+                        client, addr = sock.accept()
+                    except BlockingIOError:
+                        break
+                    except OSError as e:
+                        # Out of descriptors or an aborted handshake must not kill the echo loop
+                        if e.errno in (errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM):
+                            print(f'TCP accept failed: {e}; backing off {TCP_ECHO_ACCEPT_BACKOFF}s')
+                            time.sleep(TCP_ECHO_ACCEPT_BACKOFF)
+                        break
+                    client.setblocking(False)
+                    client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    selector.register(client, selectors.EVENT_READ, EchoConnection(client, addr))
+                continue
+
+            conn = key.data
+            try:
+                if events & selectors.EVENT_WRITE:
+                    flush(conn)
+                elif events & selectors.EVENT_READ:
+                    echo(conn)
+            except BlockingIOError:
+                pass
+            except OSError:
+                close(conn)
 
 # UDP Echo Server
 def udp_echo_server(host='0.0.0.0', port=5700):
+    """Reflects datagrams without per-packet logging; rates are reported periodically.
+
+    Datagrams that start with UDP_PROBE_MAGIC get the server receive time stamped into
+    their header before being sent back, so clients can split RTT into both directions.
+    """
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_ECHO_SOCKET_BUFFER)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, UDP_ECHO_SOCKET_BUFFER)
     sock.bind((host, port))
+    sock.settimeout(UDP_ECHO_REPORT_INTERVAL)
     print(f'UDP Echo Server listening on {host}:{port}')
 
+    view = memoryview(bytearray(UDP_ECHO_BUFFER_SIZE))
+    packets = received_bytes = dropped = 0
+    last_report = time.monotonic()
+
     while True:
-        data, addr = sock.recvfrom(1024)
-        print(f'Received data from {addr}: {data.decode()}')
-        sock.sendto(data, addr)  # Echo the received data back
+        try:
+            # Block for the first datagram, then drain whatever else is queued without waiting
+            sock.settimeout(UDP_ECHO_REPORT_INTERVAL)
+            nbytes, addr = sock.recvfrom_into(view)
+            sock.setblocking(False)
+            while True:
+                if nbytes >= UDP_PROBE_HEADER.size and view[:4] == UDP_PROBE_MAGIC:
+                    struct.pack_into('!Q', view, UDP_PROBE_SERVER_OFFSET, time.time_ns())
+                try:
+                    sock.sendto(view[:nbytes], addr)
+                except OSError:
+                    # Full send buffer (BlockingIOError) or an unreachable client
+                    dropped += 1
+                packets += 1
+                received_bytes += nbytes
+                nbytes, addr = sock.recvfrom_into(view)
+        except (BlockingIOError, socket.timeout):
+            pass
+
+        now = time.monotonic()
+        if now - last_report >= UDP_ECHO_REPORT_INTERVAL:
+            if packets:
+                elapsed = now - last_report
+                print(f'UDP echo: {packets / elapsed:.0f} packets/s, '
+                      f'{received_bytes / elapsed / 1_000_000:.2f} MB/s, {dropped} replies dropped')
+            packets = received_bytes = dropped = 0
+            last_report = now
 
-# HTTP Server with Reset Endpoint
+# HTTP Server with Reset and fault-injection endpoints
 class ResetHandler(BaseHTTPRequestHandler):
+    """Answers /reset and /fault; keep-alive is supported so clients can reuse connections.
+
+    /fault?mode=... injects one failure per request:
+      delay       wait `delay` seconds before sending anything
+      drip        send a `size` byte body `chunk` bytes at a time every `interval` seconds
+      rst         announce `size` bytes, send `after` of them, then reset the connection
+      half-close  announce `size` bytes, send `after` of them, then shut down our write side
+      headers     send `size` bytes of response headers split into `header_size` byte values
+    """
+    protocol_version = 'HTTP/1.1'
+
     def do_GET(self):
-        if self.path.startswith('/reset'):
-            parsed_url = urllib.parse.urlparse(self.path)
-            query_params = urllib.parse.parse_qs(parsed_url.query)
-            
+        parsed_url = urllib.parse.urlparse(self.path)
+        query_params = urllib.parse.parse_qs(parsed_url.query)
+
+        if parsed_url.path == '/reset':
             do_param = query_params.get('do', ['false'])[0].lower()
-            
+
             if do_param == 'true':
                 # Send RST packet
                 self.send_reset()
             else:
                 # Return 200 OK
+                self.send_body(200, b"OK")
+        elif parsed_url.path == '/fault':
+            self.inject_fault(query_params)
+        else:
+            self.send_body(404, b"Not Found")
+
+    def log_message(self, format, *args):
+        if HTTP_LOG_REQUESTS:
+            super().log_message(format, *args)
+
+    def send_body(self, status, body, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def inject_fault(self, query_params):
+        def param(name, default, cast=int, low=0, high=None):
+            try:
+                value = cast(query_params.get(name, [default])[0])
+            except ValueError:
+                raise ValueError(f'invalid {name}')
+            if value != value or value < low or (high is not None and value > high):
+                raise ValueError(f'{name} must be between {low} and {high}')
+            return value
+
+        # Validate everything before the status line goes out, so a bad parameter is a
+        # clean 400 rather than text spliced into a half-sent body
+        mode = query_params.get('mode', [''])[0]
+        try:
+            size = param('size', 1024, high=HTTP_FAULT_MAX_BYTES)
+            after = param('after', size // 2, high=size)
+            if mode == 'delay':
+                delay = param('delay', 5, float, high=HTTP_FAULT_MAX_DELAY)
+            elif mode == 'drip':
+                chunk = param('chunk', 1, low=1, high=HTTP_FAULT_MAX_BYTES)
+                interval = param('interval', 0.1, float, high=HTTP_FAULT_MAX_DELAY)
+            elif mode == 'headers':
+                header_size = param('header_size', max(size, 1), low=1, high=HTTP_FAULT_MAX_BYTES)
+        except ValueError as e:
+            self.send_body(400, str(e).encode())
+            return
+
+        try:
+            if mode == 'delay':
+                time.sleep(delay)
+                self.send_body(200, b"OK")
+            elif mode == 'drip':
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(size))
+                self.end_headers()
+                piece = b'x' * chunk
+                for offset in range(0, size, chunk):
+                    self.wfile.write(piece[:size - offset])
+                    time.sleep(interval)
+            elif mode in ('rst', 'half-close'):
                 self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(size))
                 self.end_headers()
-                self.wfile.write(b"OK")
+                self.wfile.write(b'x' * after)
+                if mode == 'rst':
+                    self.send_reset()
+                else:
+                    self.send_half_close()
+            elif mode == 'headers':
+                padding = [('X-Padding-%d' % index, 'x' * min(header_size, size - offset))
+                           for index, offset in enumerate(range(0, size, header_size))]
+                self.send_body(200, b"OK", padding)
+            else:
+                self.send_body(400, b"mode must be one of delay, drip, rst, half-close, headers")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
 
     def send_reset(self):
         # Get the client socket
@@ -62,10 +290,28 @@ class ResetHandler(BaseHTTPRequestHandler):
         
         # Close the socket to trigger the RST
         client_socket.close()
+        self.close_connection = True
+
+    def send_half_close(self):
+        # Stop sending but keep reading until the client gives up, so it sees a clean FIN
+        # in the middle of the body rather than a reset
+        client_socket = self.request
+        client_socket.shutdown(socket.SHUT_WR)
+        client_socket.settimeout(HTTP_FAULT_MAX_DELAY)
+        try:
+            while client_socket.recv(65536):
+                pass
+        except OSError:
+            pass
+        self.close_connection = True
+
+class FaultHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = HTTP_BACKLOG
 
 def http_server(host='0.0.0.0', port=5800):
     server_address = (host, port)
-    httpd = HTTPServer(server_address, ResetHandler)
+    httpd = FaultHTTPServer(server_address, ResetHandler)
     print(f'HTTP Server with Reset endpoint listening on {host}:{port}')
     httpd.serve_forever()
 
@@ -0,0 +1,114 @@
+"""UDP echo load client: sends probes at a fixed packet rate and reports loss, reordering and RTT.
+
+    python udp_client.py --host network-debug --rate 20000 --duration 10 --size 512
+"""
+import argparse
+import socket
+import threading
+import time
+
+from main import UDP_PROBE_HEADER, UDP_PROBE_MAGIC
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def receiver(sock, stop, results):
+    view = memoryview(bytearray(65536))
+    highest = -1
+    seen = set()
+    rtts = []
+    forward = []
+    reordered = duplicates = errors = 0
+
+    while not stop.is_set():
+        try:
+            nbytes = sock.recv_into(view)
+        except socket.timeout:
+            continue
+        except OSError:
+            # An ICMP port unreachable surfaces here as ConnectionRefusedError on a connected socket
+            errors += 1
+            continue
+        now = time.time_ns()
+        if nbytes < UDP_PROBE_HEADER.size:
+            continue
+        magic, seq, client_ns, server_ns = UDP_PROBE_HEADER.unpack_from(view)
+        if magic != UDP_PROBE_MAGIC:
+            continue
+        if seq in seen:
+            duplicates += 1
+            continue
+        seen.add(seq)
+        if seq < highest:
+            reordered += 1
+        highest = max(highest, seq)
+        rtts.append((now - client_ns) / 1e6)
+        forward.append((server_ns - client_ns) / 1e6)
+
+    results.update(received=len(seen), reordered=reordered, duplicates=duplicates,
+                   rtts=rtts, forward=forward, receive_errors=errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5700)
+    parser.add_argument('--rate', type=int, default=1000, help='packets per second')
+    parser.add_argument('--duration', type=float, default=10, help='seconds to send for')
+    parser.add_argument('--size', type=int, default=64, help='datagram size in bytes')
+    parser.add_argument('--drain', type=float, default=1.0, help='seconds to wait for late replies')
+    args = parser.parse_args()
+
+    size = max(args.size, UDP_PROBE_HEADER.size)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    sock.connect((args.host, args.port))
+    sock.settimeout(0.2)
+
+    stop = threading.Event()
+    # Filled in by the receiver; the defaults keep the report working if it stops early
+    results = dict(received=0, reordered=0, duplicates=0, rtts=[], forward=[], receive_errors=0)
+    thread = threading.Thread(target=receiver, args=(sock, stop, results), daemon=True)
+    thread.start()
+
+    payload = bytearray(size)
+    interval = 1.0 / args.rate
+    total = int(args.rate * args.duration)
+    send_errors = 0
+    started = time.monotonic()
+    for seq in range(total):
+        # Pace against the schedule rather than the previous send so the rate does not drift
+        delay = started + seq * interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        UDP_PROBE_HEADER.pack_into(payload, 0, UDP_PROBE_MAGIC, seq, time.time_ns(), 0)
+        try:
+            sock.send(payload)
+        except OSError:
+            send_errors += 1
+    send_elapsed = time.monotonic() - started
+
+    time.sleep(args.drain)
+    stop.set()
+    thread.join()
+
+    received = results['received']
+    rtts = sorted(results['rtts'])
+    forward = sorted(results['forward'])
+    print(f'sent:        {total} packets in {send_elapsed:.2f}s ({total / send_elapsed:.0f} pps), {send_errors} send errors')
+    print(f'received:    {received} ({100.0 * (total - received) / total if total else 0:.3f}% loss)')
+    print(f'reordered:   {results["reordered"]}, duplicates: {results["duplicates"]}, '
+          f'receive errors: {results["receive_errors"]}')
+    print('rtt ms:      ' + ', '.join(f'p{p * 100:g}={percentile(rtts, p):.3f}' for p in (0.5, 0.9, 0.99, 0.999))
+          + f', max={rtts[-1] if rtts else 0:.3f}')
+    print('forward ms:  ' + ', '.join(f'p{p * 100:g}={percentile(forward, p):.3f}' for p in (0.5, 0.99))
+          + ' (needs synchronized clocks)')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,180 +1,695 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+import os
 import threading
 import time
-import psutil
 import multiprocessing
-import gc
-from typing import Dict, Any
+import mmap
+import uuid
+import asyncio
+import json
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Literal, Optional
 
 app = FastAPI(title="Resource Stress Testing API", version="1.0.0")
 
+# CPU stress engine settings
+CPU_DUTY_PERIOD = float(os.environ.get("CPU_DUTY_PERIOD", "0.1"))
+CPU_SAMPLE_INTERVAL = float(os.environ.get("CPU_SAMPLE_INTERVAL", "0.5"))
+CPU_CONTROL_GAIN = float(os.environ.get("CPU_CONTROL_GAIN", "0.6"))
+CPU_WORKER_START_TIMEOUT = 30
+
+# Memory stress engine settings
+MEMORY_CHUNK_SIZE = int(os.environ.get("MEMORY_CHUNK_SIZE", str(64 * 1024 * 1024)))
+MEMORY_SAMPLE_INTERVAL = float(os.environ.get("MEMORY_SAMPLE_INTERVAL", "0.25"))
+MEMORY_RAMP_TICK = 0.05
+
+# System sampler settings
+SAMPLER_INTERVAL = float(os.environ.get("SAMPLER_INTERVAL", "1.0"))
+SAMPLER_HISTORY_SIZE = int(os.environ.get("SAMPLER_HISTORY_SIZE", "300"))
+SAMPLER_SUBSCRIBER_QUEUE_SIZE = 16
+
+# Job scheduler settings: ceilings are the total percentage running jobs may reserve
+JOB_CPU_CEILING = float(os.environ.get("JOB_CPU_CEILING", "100"))
+JOB_MEMORY_CEILING = float(os.environ.get("JOB_MEMORY_CEILING", "90"))
+JOB_MAX_WORKERS = int(os.environ.get("JOB_MAX_WORKERS", "16"))
+JOB_HISTORY_SIZE = int(os.environ.get("JOB_HISTORY_SIZE", "100"))
+
 class StressRequest(BaseModel):
     percentage: float = Field(..., ge=0, le=100, description="Percentage of resource to stress (0-100)")
     duration: int = Field(..., gt=0, description="Duration in seconds")
+    cores: Optional[List[int]] = Field(None, description="CPU cores to pin the CPU stress workers to (default: all available cores)")
+    tolerance: float = Field(5.0, gt=0, le=100, description="Accepted distance in percentage points between requested and achieved CPU")
+    profile: Literal["instant", "linear", "step", "sawtooth"] = Field("instant", description="How memory grows towards the target")
+    ramp_seconds: Optional[float] = Field(None, gt=0, description="Length of one memory ramp (default: half the duration)")
+    steps: int = Field(4, ge=1, description="Number of increments for the step memory profile")
+
+class CpuSample(BaseModel):
+    elapsed: float
+    requested_percentage: float
+    achieved_percentage: float
+    per_core_percentage: List[float]
+
+class MemorySample(BaseModel):
+    elapsed: float
+    target_bytes: int
+    allocated_bytes: int
+    rss_bytes: int
 
 class StressResponse(BaseModel):
     message: str
     percentage: float
     duration: int
     status: str
+    achieved_percentage: Optional[float] = None
+    within_tolerance: Optional[bool] = None
+    cores: Optional[List[int]] = None
+    samples: Optional[List[CpuSample]] = None
+    job_id: Optional[str] = None
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    percentage: float
+    duration: int
+    progress: float
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    last_sample: Optional[Dict[str, Any]] = None
+
+def available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(multiprocessing.cpu_count()))
+
+def cpu_worker(duty, ready, stop, core: Optional[int], period: float):
+    """Busy-loops for `duty` of every `period` seconds until `stop` is set"""
+    if core is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {core})
+    with ready.get_lock():
+        ready.value += 1
+
+    while not stop.is_set():
+        start = time.perf_counter()
+        busy_until = start + period * duty.value
+        while time.perf_counter() < busy_until:
+            pass  # Busy wait
+        idle = period - (time.perf_counter() - start)
+        if idle > 0:
+            time.sleep(idle)
+
+class CpuStressEngine:
+    """Closed-loop CPU stress built on one worker process per core.
+
+    Each worker runs a duty cycle that is not serialized by the GIL. A controller thread
+    measures the CPU time every worker actually got and nudges each duty cycle until the
+    achieved utilization matches the requested percentage.
+    """
+
+    def __init__(self, percentage: float, duration: float, cores: Optional[List[int]] = None, tolerance: float = 5.0,
+                 stop_event: Optional[threading.Event] = None, on_sample: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.percentage = percentage
+        self.duration = duration
+        self.cores = cores if cores else available_cores()
+        self.tolerance = tolerance
+        self.samples = []
+        self.on_sample = on_sample
+        self._stop = stop_event or threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self) -> Dict[str, Any]:
+        # Spawn rather than fork: the parent runs an event loop and other threads
+        context = multiprocessing.get_context("spawn")
+        target = self.percentage / 100
+        ready = context.Value("i", 0)
+        stop = context.Event()
+        duties = [context.Value("d", target, lock=False) for _ in self.cores]
+        workers = [
+            context.Process(target=cpu_worker, args=(duty, ready, stop, core, CPU_DUTY_PERIOD), daemon=True)
+            for duty, core in zip(duties, self.cores)
+        ]
+
+        try:
+            for worker in workers:
+                worker.start()
+            deadline = time.monotonic() + CPU_WORKER_START_TIMEOUT
+            while ready.value < len(workers) and time.monotonic() < deadline and not self._stop.is_set():
+                time.sleep(0.01)
+
+            import psutil
+            processes = [psutil.Process(worker.pid) for worker in workers]
+            started = last = time.monotonic()
+            last_cpu = [sum(process.cpu_times()[:2]) for process in processes]
+            while not self._stop.wait(CPU_SAMPLE_INTERVAL):
+                now = time.monotonic()
+                cpu = [sum(process.cpu_times()[:2]) for process in processes]
+                utilization = [(used - previous) / (now - last) for used, previous in zip(cpu, last_cpu)]
+                last, last_cpu = now, cpu
+
+                # Integral control per core: move each duty cycle by the remaining error
+                for duty, achieved in zip(duties, utilization):
+                    duty.value = min(1.0, max(0.0, duty.value + CPU_CONTROL_GAIN * (target - achieved)))
+
+                sample = {
+                    "elapsed": round(now - started, 3),
+                    "requested_percentage": self.percentage,
+                    "achieved_percentage": round(100 * sum(utilization) / len(utilization), 2),
+                    "per_core_percentage": [round(100 * value, 2) for value in utilization],
+                }
+                self.samples.append(sample)
+                if self.on_sample:
+                    self.on_sample(sample)
+                if now - started >= self.duration:
+                    break
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join(timeout=2)
+                if worker.is_alive():
+                    worker.terminate()
+
+        # The first sample includes the controller settling in, leave it out of the average
+        steady = self.samples[1:] or self.samples
+        achieved = sum(sample["achieved_percentage"] for sample in steady) / len(steady) if steady else 0.0
+        return {
+            "achieved_percentage": round(achieved, 2),
+            "within_tolerance": abs(achieved - self.percentage) <= self.tolerance,
+            "cores": self.cores,
+            "samples": self.samples,
+        }
 
-def stress_cpu(percentage: float, duration: int):
+def validate_cores(cores: Optional[List[int]]):
+    if cores:
+        unavailable = set(cores) - set(available_cores())
+        if unavailable:
+            raise ValueError(f"Cores not available to this process: {sorted(unavailable)}")
+
+def stress_cpu(percentage: float, duration: int, cores: Optional[List[int]] = None, tolerance: float = 5.0,
+               stop_event: Optional[threading.Event] = None, on_sample=None) -> Dict[str, Any]:
     """Stress CPU by consuming specified percentage for given duration"""
-    num_cores = multiprocessing.cpu_count()
-    
-    def cpu_stress():
-        end_time = time.time() + duration
-        while time.time() < end_time:
-            if percentage < 100:
-                # Calculate work/sleep ratio to achieve target percentage
-                work_time = percentage / 100 * 0.1
-                sleep_time = (100 - percentage) / 100 * 0.1
-                
-                start = time.time()
-                while time.time() - start < work_time:
-                    pass  # Busy wait
-                time.sleep(sleep_time)
-            else:
-                # 100% CPU usage - no sleep
-                pass
-    
-    # Start threads for each core to maximize CPU usage
-    threads = []
-    num_threads = max(1, int(num_cores * percentage / 100))
-    
-    for _ in range(num_threads):
-        thread = threading.Thread(target=cpu_stress)
-        threads.append(thread)
-        thread.start()
-    
-    # Wait for all threads to complete
-    for thread in threads:
-        thread.join()
-
-def stress_memory(percentage: float, duration: int):
+    validate_cores(cores)
+    return CpuStressEngine(percentage, duration, cores, tolerance, stop_event, on_sample).run()
+
+class MemoryStressEngine:
+    """Memory stress backed by anonymous mmap regions.
+
+    Every page of a region is written as soon as it is mapped, so the kernel has to commit
+    it and RSS grows for real. Memory follows the requested ramp profile and released
+    regions are unmapped immediately instead of waiting for the allocator or gc.
+    """
+
+    def __init__(self, target_bytes: int, duration: float, profile: str = "instant", ramp_seconds: Optional[float] = None,
+                 steps: int = 4, stop_event: Optional[threading.Event] = None,
+                 on_sample: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.target_bytes = target_bytes
+        self.duration = duration
+        self.profile = profile
+        self.ramp_seconds = ramp_seconds or duration / 2
+        self.steps = steps
+        self.regions = []
+        self.allocated = 0
+        self.samples = []
+        self.on_sample = on_sample
+        self._stop = stop_event or threading.Event()
+        import psutil
+        self._process = psutil.Process()
+
+    def target_at(self, elapsed: float) -> int:
+        """Bytes that should be resident `elapsed` seconds into the run"""
+        if self.profile == "instant":
+            return self.target_bytes
+        position = elapsed / self.ramp_seconds
+        if self.profile == "sawtooth":
+            position %= 1.0
+        elif position >= 1.0:
+            return self.target_bytes
+        if self.profile == "step":
+            position = (int(position * self.steps) + 1) / self.steps
+        return int(self.target_bytes * position)
+
+    def grow(self, size: int):
+        size = max(mmap.PAGESIZE, size - size % mmap.PAGESIZE)
+        region = mmap.mmap(-1, size, flags=mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS)
+        # A non-zero byte per page forces a real, private page (zero pages can be shared)
+        region[::mmap.PAGESIZE] = b"\x01" * len(range(0, size, mmap.PAGESIZE))
+        self.regions.append(region)
+        self.allocated += size
+
+    def shrink(self, target: int):
+        while self.regions and self.allocated - len(self.regions[-1]) >= target:
+            region = self.regions.pop()
+            self.allocated -= len(region)
+            region.close()
+
+    def release(self):
+        self.shrink(0)
+
+    def sample(self, elapsed: float, target: int) -> Dict[str, Any]:
+        sample = {
+            "elapsed": round(elapsed, 3),
+            "target_bytes": target,
+            "allocated_bytes": self.allocated,
+            "rss_bytes": self._process.memory_info().rss,
+        }
+        self.samples.append(sample)
+        if self.on_sample:
+            self.on_sample(sample)
+        return sample
+
+    def run(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        next_sample = started
+        peak_allocated = 0
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if now - started >= self.duration:
+                    break
+                target = self.target_at(now - started)
+                self.shrink(target)
+                growing = self.allocated < target - mmap.PAGESIZE
+                if growing:
+                    # One chunk per iteration so a stop request is noticed during a large ramp
+                    self.grow(min(MEMORY_CHUNK_SIZE, target - self.allocated))
+                    peak_allocated = max(peak_allocated, self.allocated)
+                if now >= next_sample:
+                    self.sample(now - started, target)
+                    next_sample = now + MEMORY_SAMPLE_INTERVAL
+                if not growing:
+                    self._stop.wait(MEMORY_RAMP_TICK)
+        finally:
+            self.release()
+
+        return {
+            "target_bytes": self.target_bytes,
+            "profile": self.profile,
+            "peak_allocated_bytes": peak_allocated,
+            "peak_rss_bytes": max([sample["rss_bytes"] for sample in self.samples], default=0),
+            "samples": self.samples,
+        }
+
+def stress_memory(percentage: float, duration: int, stop_event: Optional[threading.Event] = None,
+                  profile: str = "instant", ramp_seconds: Optional[float] = None, steps: int = 4,
+                  on_sample=None) -> Dict[str, Any]:
     """Stress memory by consuming specified percentage for given duration"""
     # Get total system memory
+    import psutil
     total_memory = psutil.virtual_memory().total
     target_memory = int(total_memory * percentage / 100)
-    
-    # Allocate memory in chunks
-    chunk_size = 1024 * 1024  # 1MB chunks
-    chunks = []
-    
-    try:
-        # Allocate memory
-        allocated = 0
-        while allocated < target_memory:
-            remaining = target_memory - allocated
-            current_chunk_size = min(chunk_size, remaining)
-            chunk = bytearray(current_chunk_size)
-            chunks.append(chunk)
-            allocated += current_chunk_size
-        
-        # Hold memory for specified duration
-        time.sleep(duration)
-        
-    finally:
-        # Clean up memory
-        chunks.clear()
-        gc.collect()
+    return MemoryStressEngine(target_memory, duration, profile, ramp_seconds, steps, stop_event, on_sample).run()
 
-def stress_both(percentage: float, duration: int):
+def stress_both(request: StressRequest, stop_event: Optional[threading.Event] = None,
+                on_sample=None) -> Dict[str, Any]:
     """Stress both CPU and memory simultaneously"""
-    cpu_thread = threading.Thread(target=stress_cpu, args=(percentage, duration))
-    memory_thread = threading.Thread(target=stress_memory, args=(percentage, duration))
-    
-    cpu_thread.start()
+    stop_event = stop_event or threading.Event()
+    memory_result = {}
+    memory_error = []
+    latest = {"cpu": None, "memory": None}
+
+    def record(kind):
+        def update(sample):
+            latest[kind] = sample
+            if on_sample:
+                on_sample(dict(latest))
+        return update
+
+    def run_memory():
+        try:
+            memory_result.update(stress_memory(request.percentage, request.duration, stop_event, request.profile,
+                                               request.ramp_seconds, request.steps, record("memory")))
+        except Exception as e:
+            memory_error.append(e)
+            # Stop the CPU half as well; the job has failed either way
+            stop_event.set()
+
+    memory_thread = threading.Thread(target=run_memory)
     memory_thread.start()
-    
-    cpu_thread.join()
-    memory_thread.join()
+    try:
+        cpu_result = stress_cpu(request.percentage, request.duration, request.cores, request.tolerance, stop_event,
+                                record("cpu"))
+    except BaseException:
+        stop_event.set()
+        raise
+    finally:
+        # Both halves run for the same duration, so on success this only waits for the memory
+        # release; the stop event is left alone so the job is not reported as cancelled
+        memory_thread.join()
+    if memory_error:
+        raise memory_error[0]
+    return {"cpu": cpu_result, "memory": memory_result}
+
+class CapacityError(Exception):
+    pass
+
+class Job:
+    def __init__(self, kind: str, request: StressRequest, runner: Callable[["Job"], Optional[Dict[str, Any]]]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.request = request
+        self.runner = runner
+        self.status = "pending"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.last_sample = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("pending", "running")
+
+    @property
+    def cpu_share(self) -> float:
+        return self.request.percentage if self.kind in ("cpu", "both") else 0.0
+
+    @property
+    def memory_share(self) -> float:
+        return self.request.percentage if self.kind in ("memory", "both") else 0.0
+
+    def progress(self) -> float:
+        if self.status == "completed":
+            return 1.0
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at or time.time()
+        return min(1.0, (end - self.started_at) / self.request.duration)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "percentage": self.request.percentage,
+            "duration": self.request.duration,
+            "progress": round(self.progress(), 3),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "last_sample": self.last_sample,
+        }
+
+class JobScheduler:
+    """Runs stress jobs on a background thread pool and keeps their status.
+
+    Jobs reserve their CPU and memory percentage when they are submitted. A job that would
+    push the reservations of active jobs past the configured ceiling is rejected rather
+    than queued, so overlapping jobs can never stress the node beyond the ceiling.
+    """
+
+    def __init__(self, cpu_ceiling: float, memory_ceiling: float, max_workers: int, history_size: int):
+        self.cpu_ceiling = cpu_ceiling
+        self.memory_ceiling = memory_ceiling
+        self.history_size = history_size
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stress-job")
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, kind: str, request: StressRequest, runner: Callable[[Job], Optional[Dict[str, Any]]]) -> Job:
+        job = Job(kind, request, runner)
+        with self.lock:
+            active = [existing for existing in self.jobs.values() if existing.active]
+            cpu_reserved = sum(existing.cpu_share for existing in active)
+            memory_reserved = sum(existing.memory_share for existing in active)
+            if cpu_reserved + job.cpu_share > self.cpu_ceiling:
+                raise CapacityError(f"CPU ceiling of {self.cpu_ceiling}% reached ({cpu_reserved}% reserved by running jobs)")
+            if memory_reserved + job.memory_share > self.memory_ceiling:
+                raise CapacityError(f"Memory ceiling of {self.memory_ceiling}% reached ({memory_reserved}% reserved by running jobs)")
+            if len(active) >= self.max_workers:
+                raise CapacityError(f"At most {self.max_workers} jobs can run at once")
+            self.jobs[job.id] = job
+            self._trim_history()
+        self.executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: Job):
+        if job.cancel_event.is_set():
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = job.runner(job)
+            job.status = "cancelled" if job.cancel_event.is_set() else "completed"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is not None and job.active:
+            job.cancel_event.set()
+            if job.status == "pending":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        return job
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self.jobs[job_id]
+
+scheduler = JobScheduler(JOB_CPU_CEILING, JOB_MEMORY_CEILING, JOB_MAX_WORKERS, JOB_HISTORY_SIZE)
+
+def submit_job(kind: str, request: StressRequest, runner, description: str) -> StressResponse:
+    try:
+        job = scheduler.submit(kind, request, runner)
+    except CapacityError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return StressResponse(
+        message=f"{description} stress job started at {request.percentage}% for {request.duration} seconds",
+        percentage=request.percentage,
+        duration=request.duration,
+        status=job.status,
+        job_id=job.id
+    )
 
 @app.get("/")
 async def root():
-    return {"message": "Resource Stress Testing API", "endpoints": ["/stress-cpu", "/stress-memory", "/stress-both"]}
+    return {"message": "Resource Stress Testing API", "endpoints": ["/stress-cpu", "/stress-memory", "/stress-both", "/jobs", "/system-info", "/system-info/stream"]}
 
-@app.post("/stress-cpu", response_model=StressResponse)
+@app.post("/stress-cpu", response_model=StressResponse, status_code=202)
 async def stress_cpu_endpoint(request: StressRequest):
     """
-    Stress CPU to specified percentage for given duration
+    Start a job that stresses CPU to specified percentage for given duration
     """
     try:
-        def run_stress():
-            stress_cpu(request.percentage, request.duration)
-        
-        thread = threading.Thread(target=run_stress)
-        thread.start()
-        thread.join()
-        
-        return StressResponse(
-            message=f"CPU stressed at {request.percentage}% for {request.duration} seconds",
-            percentage=request.percentage,
-            duration=request.duration,
-            status="completed"
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error stressing CPU: {str(e)}")
-
-@app.post("/stress-memory", response_model=StressResponse)
+        validate_cores(request.cores)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def run_stress(job: Job):
+        def record(sample):
+            job.last_sample = sample
+        return stress_cpu(request.percentage, request.duration, request.cores, request.tolerance, job.cancel_event,
+                          record)
+
+    return submit_job("cpu", request, run_stress, "CPU")
+
+@app.post("/stress-memory", response_model=StressResponse, status_code=202)
 async def stress_memory_endpoint(request: StressRequest):
     """
-    Stress memory to specified percentage for given duration
+    Start a job that stresses memory to specified percentage for given duration
     """
-    try:
-        def run_stress():
-            stress_memory(request.percentage, request.duration)
-        
-        thread = threading.Thread(target=run_stress)
-        thread.start()
-        thread.join()
-        
-        return StressResponse(
-            message=f"Memory stressed at {request.percentage}% for {request.duration} seconds",
-            percentage=request.percentage,
-            duration=request.duration,
-            status="completed"
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error stressing memory: {str(e)}")
-
-@app.post("/stress-both", response_model=StressResponse)
+    def run_stress(job: Job):
+        def record(sample):
+            job.last_sample = sample
+        return stress_memory(request.percentage, request.duration, job.cancel_event, request.profile,
+                             request.ramp_seconds, request.steps, record)
+
+    return submit_job("memory", request, run_stress, "Memory")
+
+@app.post("/stress-both", response_model=StressResponse, status_code=202)
 async def stress_both_endpoint(request: StressRequest):
     """
-    Stress both CPU and memory to specified percentage for given duration
+    Start a job that stresses both CPU and memory to specified percentage for given duration
     """
     try:
-        def run_stress():
-            stress_both(request.percentage, request.duration)
-        
-        thread = threading.Thread(target=run_stress)
-        thread.start()
-        thread.join()
-        
-        return StressResponse(
-            message=f"CPU and Memory stressed at {request.percentage}% for {request.duration} seconds",
-            percentage=request.percentage,
-            duration=request.duration,
-            status="completed"
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error stressing resources: {str(e)}")
+        validate_cores(request.cores)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def run_stress(job: Job):
+        def record(sample):
+            job.last_sample = sample
+        return stress_both(request, job.cancel_event, record)
+
+    return submit_job("both", request, run_stress, "CPU and Memory")
+
+@app.get("/jobs", response_model=List[JobResponse])
+async def list_jobs():
+    """List active and recently finished stress jobs"""
+    return [job.to_dict() for job in list(scheduler.jobs.values())]
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Get the status and progress of a stress job"""
+    job = scheduler.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.delete("/jobs/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Cancel a pending or running stress job"""
+    job = scheduler.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+class SystemSampler:
+    """Samples system and process resource usage on a background thread.
+
+    Samples go into a fixed-size ring buffer, so /system-info answers from memory instead
+    of blocking the event loop on psutil. Stream subscribers get each new sample pushed to
+    their own bounded queue; a subscriber that falls behind loses its oldest samples.
+    psutil is imported on the sampler thread, so it does not delay the server's startup.
+    """
+
+    def __init__(self, interval: float, history_size: int):
+        self.interval = interval
+        self.samples = deque(maxlen=history_size)
+        self.subscribers = set()
+        self.sequence = 0
+        self._process = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="system-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        import psutil
+        # Prime the CPU counters so the first real sample covers one interval
+        psutil.cpu_percent(percpu=True)
+        while not self._stop.wait(self.interval):
+            sample = self.take()
+            self.samples.append(sample)
+            self._ready.set()
+            for loop, queue in list(self.subscribers):
+                loop.call_soon_threadsafe(self._offer, queue, sample)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, sample: Dict[str, Any]):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(sample)
+
+    def take(self) -> Dict[str, Any]:
+        import psutil
+        if self._process is None:
+            self._process = psutil.Process()
+        per_core = psutil.cpu_percent(percpu=True)
+        memory = psutil.virtual_memory()
+        network = psutil.net_io_counters()
+        disk = psutil.disk_io_counters()
+        self.sequence += 1
+        return {
+            "sequence": self.sequence,
+            "timestamp": time.time(),
+            "cpu_percent": round(sum(per_core) / len(per_core), 2) if per_core else 0.0,
+            "cpu_per_core_percent": per_core,
+            "memory_total_bytes": memory.total,
+            "memory_available_bytes": memory.available,
+            "memory_percent": memory.percent,
+            "process_rss_bytes": self._process.memory_info().rss,
+            "network": network._asdict() if network else None,
+            "disk": disk._asdict() if disk else None,
+        }
+
+    def latest(self, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        """Returns the newest sample, waiting up to `timeout` seconds for the first one.
+
+        Sampling is left to the background thread: an inline sample would race it on the
+        sequence number and reset psutil's CPU baseline, so its next sample would read 0.
+        """
+        if not self._ready.wait(timeout):
+            return None
+        return self.samples[-1]
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SAMPLER_SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers = {subscriber for subscriber in self.subscribers if subscriber[1] is not queue}
+
+sampler = SystemSampler(SAMPLER_INTERVAL, SAMPLER_HISTORY_SIZE)
+
+@app.on_event("startup")
+async def start_sampler():
+    sampler.start()
+
+@app.on_event("shutdown")
+async def stop_sampler():
+    sampler.stop()
 
 @app.get("/system-info")
 async def get_system_info():
     """Get current system resource information"""
-    cpu_percent = psutil.cpu_percent(interval=1)
-    memory = psutil.virtual_memory()
-    
+    sample = sampler.latest()
+    if sample is None:
+        sample = await asyncio.to_thread(sampler.latest, sampler.interval + 1)
+    if sample is None:
+        raise HTTPException(status_code=503, detail="System sampler is warming up")
+
     return {
         "cpu_cores": multiprocessing.cpu_count(),
-        "cpu_usage_percent": cpu_percent,
-        "total_memory_gb": round(memory.total / (1024**3), 2),
-        "available_memory_gb": round(memory.available / (1024**3), 2),
-        "memory_usage_percent": memory.percent
+        "cpu_usage_percent": sample["cpu_percent"],
+        "total_memory_gb": round(sample["memory_total_bytes"] / (1024**3), 2),
+        "available_memory_gb": round(sample["memory_available_bytes"] / (1024**3), 2),
+        "memory_usage_percent": sample["memory_percent"],
+        "cpu_per_core_percent": sample["cpu_per_core_percent"],
+        "process_rss_bytes": sample["process_rss_bytes"],
+        "network": sample["network"],
+        "disk": sample["disk"],
+        "sampled_at": sample["timestamp"]
     }
 
+@app.get("/system-info/history")
+async def get_system_info_history(limit: int = SAMPLER_HISTORY_SIZE):
+    """Get the most recent samples from the ring buffer, oldest first"""
+    samples = list(sampler.samples)
+    return {"interval": sampler.interval, "samples": samples[-limit:] if limit > 0 else []}
+
+@app.get("/system-info/stream")
+async def stream_system_info(history: int = 0):
+    """Stream samples as server-sent events as soon as they are taken"""
+    queue = sampler.subscribe()
+    backlog = list(sampler.samples)[-history:] if history > 0 else []
+
+    async def event_stream():
+        try:
+            for sample in backlog:
+                yield f"id: {sample['sequence']}\ndata: {json.dumps(sample)}\n\n"
+            while True:
+                sample = await queue.get()
+                yield f"id: {sample['sequence']}\ndata: {json.dumps(sample)}\n\n"
+        finally:
+            sampler.unsubscribe(queue)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)